@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк пошуку заявок у циклі poll_manager_proposals.
+
+Порівнює старий підхід (для кожного рядка таблиці перебір усіх заявок
+усіх користувачів, O(rows × applications)) із зворотним індексом
+sheet_row -> (uid, app_index) у ApplicationStore (O(rows)).
+
+Запуск (Google/Telegram не потрібні, дані пишуться у тимчасову теку):
+    python benchmarks/poller_index.py 1000 10000 50000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+DATA_DIR = tempfile.mkdtemp(prefix="agro-bench-")
+os.environ.setdefault("DATA_DIR", DATA_DIR)
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:bench")
+os.environ.setdefault("GSPREAD_CREDENTIALS_JSON", "{}")
+os.environ.setdefault("APPS_JOURNAL_FSYNC", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging  # noqa: E402
+
+import bot  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+APPS_PER_USER = 5
+
+
+def build_store(rows: int):
+    apps = {}
+    for i in range(rows):
+        uid = str(100000 + i // APPS_PER_USER)
+        apps.setdefault(uid, []).append({
+            "culture": "Пшениця",
+            "quantity": "10",
+            "sheet_row": i + 2,
+            "proposal_status": "active",
+        })
+    store = bot.ApplicationStore(
+        os.path.join(DATA_DIR, f"apps_{rows}.json"),
+        os.path.join(DATA_DIR, f"apps_{rows}.journal"),
+        compact_interval=3600, compact_records=10 ** 9, fsync=False,
+    )
+    store.replace(apps)
+    return store
+
+
+def legacy_cycle(apps: dict, rows: int) -> int:
+    found = 0
+    for i in range(2, rows + 2):
+        for uid, app_list in apps.items():
+            for idx, app in enumerate(app_list, start=1):
+                if app.get("sheet_row") == i:
+                    found += 1
+    return found
+
+
+def indexed_cycle(store, rows: int) -> int:
+    found = 0
+    for i in range(2, rows + 2):
+        if store.find_by_sheet_row(i):
+            found += 1
+    return found
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'legacy, s':>12} {'indexed, s':>12} {'speedup':>10}")
+    for rows in sizes:
+        store = build_store(rows)
+        legacy_time, legacy_found = timed(legacy_cycle, store.apps, rows)
+        indexed_time, indexed_found = timed(indexed_cycle, store, rows)
+        assert legacy_found == indexed_found == rows
+        print(f"{rows:>8} {legacy_time:>12.3f} {indexed_time:>12.4f} {legacy_time / indexed_time:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк звернень до Google Sheets на імітації API (fake_sheets.py).
+
+Для типових операцій бота рахує кількість викликів Sheets API за методами
+і час виконання з урахуванням штучної затримки на кожен запит:
+    - запис нових заявок (RequestNumberAllocator.submit)
+    - один цикл опитування цін менеджера (get_sheet1_poll_columns)
+    - повторні читання листа 1 через спільний знімок (SHEET1_SNAPSHOT)
+    - зафарбовування клітинок таблиці 2 через чергу записів
+    - масове видалення рядків з обох таблиць
+    - вивантаження бази (export_database)
+
+Запуск (Google/Telegram не потрібні):
+    python benchmarks/sheets_calls.py [рядків] [затримка_с]
+    python benchmarks/sheets_calls.py 200 0.05
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+DATA_DIR = tempfile.mkdtemp(prefix="agro-bench-")
+os.environ.setdefault("DATA_DIR", DATA_DIR)
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:bench")
+os.environ.setdefault("GSPREAD_CREDENTIALS_JSON", "{}")
+os.environ.setdefault("APPS_JOURNAL_FSYNC", "0")
+os.environ["FAKE_SHEETS"] = "1"
+os.environ.setdefault("GOOGLE_SPREADSHEET_ID", "bench-table-1")
+os.environ.setdefault("GOOGLE_SPREADSHEET_ID2", "bench-table-2")
+# Квоти не обмежуємо: тут рахуються запити, а не очікування лімітера
+os.environ.setdefault("SHEETS_READ_QUOTA_PER_MINUTE", "1000000")
+os.environ.setdefault("SHEETS_WRITE_QUOTA_PER_MINUTE", "1000000")
+os.environ.setdefault("SHEETS_READ_BURST", "1000000")
+os.environ.setdefault("SHEETS_WRITE_BURST", "1000000")
+os.environ.setdefault("SHEETS_WRITE_WINDOW_SECONDS", "0.05")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio  # noqa: E402
+import logging  # noqa: E402
+
+import bot  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+
+def measure(session, name, func, *args):
+    session.reset_calls()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    calls = ", ".join(f"{k}={v}" for k, v in sorted(session.calls.items()))
+    print(f"{name:<32} {session.total_calls:>6} {elapsed:>9.2f}   {calls}")
+
+
+def main(rows: int, latency: float):
+    session = bot.init_gspread().session
+    # Метадані таблиць відкриваємо до вимірювань і без затримки
+    bot.get_worksheet1()
+    bot.get_worksheet2()
+    session.latency = latency
+    loop = asyncio.get_event_loop()
+
+    async def submit_all():
+        for i in range(rows):
+            await bot.REQUEST_NUMBERS.submit({"fullname": "Тест Тестович", "user_id": 100000 + i, "price": 5000})
+
+    def add_applications():
+        loop.run_until_complete(submit_all())
+
+    async def read_snapshot():
+        bot.SHEET1_SNAPSHOT.invalidate()
+        for _ in range(10):
+            await bot.SHEET1_SNAPSHOT.get()
+
+    def snapshot_reads():
+        loop.run_until_complete(read_snapshot())
+
+    def fill_table2():
+        bot.get_worksheet2().update(f"L1:L{rows + 1}", [[i] for i in range(rows + 1)])
+
+    async def color_all():
+        await asyncio.gather(*(bot.color_cell_green(row) for row in range(2, rows + 2)))
+
+    def color_cells():
+        loop.run_until_complete(color_all())
+
+    def bulk_delete():
+        doomed = list(range(2, rows + 2, 2))
+        bot.delete_price_cells_in_table2(doomed)
+        bot.delete_sheet1_rows(doomed)
+
+    def export():
+        matrix = [["ID", "ПІБ", "Номер телефону", "Остання заявка", "Загальна кількість заявок"]]
+        matrix += [[100000 + i, "Тест Тестович", "+380000000000", "01.01.2024\n12:00", 3] for i in range(rows)]
+        bot.export_database(matrix)
+
+    print(f"рядків: {rows}, затримка на запит: {latency * 1000:.0f} мс")
+    print(f"{'операція':<32} {'запитів':>6} {'час, с':>9}   методи API")
+    measure(session, f"нові заявки × {rows}", add_applications)
+    measure(session, "get_sheet1_poll_columns", bot.get_sheet1_poll_columns)
+    measure(session, "SHEET1_SNAPSHOT.get × 10", snapshot_reads)
+    session.latency = 0
+    fill_table2()
+    session.latency = latency
+    measure(session, f"color_cell_green × {rows}", color_cells)
+    measure(session, f"видалення {rows // 2} рядків", bulk_delete)
+    measure(session, f"export_database ({rows} корист.)", export)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+    )
@@ -5,10 +5,21 @@ import logging
 import os
 import json
 import asyncio
+import bisect
+import csv
 import datetime
+import functools
+import heapq
+import itertools
+import random
 import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import quote
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Dispatcher, types, executor
@@ -16,12 +27,22 @@ from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Text, Regexp
 from aiogram.dispatcher.filters.state import State, StatesGroup
+from aiogram.utils.exceptions import BadRequest, NetworkError, RestartingTelegram, RetryAfter, Unauthorized
 
 from aiohttp import web
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from gspread_formatting import format_cell_range, cellFormat, Color, set_column_width
-from gspread.utils import rowcol_to_a1
+from gspread_formatting import CellFormat, Color, TextFormat, cellFormat
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    # Без openpyxl вивантаження файлом працює лише у CSV
+    Workbook = None
 
 ############################################
 # 1) ЧИТАЄМО ЗМІННІ ОТОЧЕННЯ
@@ -79,6 +100,8 @@ if not os.path.exists(DATA_DIR):
 
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 APPLICATIONS_FILE = os.path.join(DATA_DIR, "applications_by_user.json")
+APPLICATIONS_JOURNAL_FILE = os.path.join(DATA_DIR, "applications_by_user.journal")
+SQLITE_FILE = os.path.join(DATA_DIR, "agro_bot.sqlite3")
 CONFIG_FILE = os.path.join(DATA_DIR, "config.py")
 
 if not os.path.exists(USERS_FILE):
@@ -177,18 +200,188 @@ def remove_keyboard():
     return types.ReplyKeyboardRemove()
 
 ############################################
-# ФЛАГ ПАУЗИ ДЛЯ ПОЛІНГУ
+# ЧЕРГА СПОВІЩЕНЬ (ОБМЕЖЕННЯ ШВИДКОСТІ TELEGRAM)
 ############################################
 
-POLLING_PAUSED = False
+class NotificationDispatcher:
+    """
+    Черга вихідних повідомлень: поллер і обробники ставлять повідомлення в чергу
+    й не чекають на відправку. Відправляють кілька воркерів, дотримуючись лімітів
+    Telegram: загального (global_rate повідомлень/с на бота) і на один чат
+    (не частіше chat_interval секунд). RetryAfter призупиняє всю відправку на вказаний час.
+    """
+
+    def __init__(self, bot: Bot, workers: int, global_rate: float, chat_interval: float, max_attempts: int = 5):
+        self.bot = bot
+        self.workers = workers
+        self.global_interval = 1.0 / global_rate
+        self.chat_interval = chat_interval
+        self.max_attempts = max_attempts
+        self._queue = None
+        self._tasks = []
+        self._rate_lock = None
+        self._next_global_slot = 0.0
+        self._paused_until = 0.0
+        self._chat_locks = {}
+        self._chat_next_slot = {}
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def _ensure_queue(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._rate_lock = asyncio.Lock()
+        return self._queue
+
+    def enqueue(self, chat_id, text: str, callback=None, **kwargs):
+        """
+        Поставити повідомлення в чергу (без очікування відправки).
+        callback(error) викликається після відправки (error=None) або остаточної невдачі.
+        """
+        self._ensure_queue().put_nowait((chat_id, text, kwargs, callback))
+
+    def start(self):
+        self._ensure_queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0):
+        """Дочекатися відправки вже поставлених повідомлень (не довше timeout) і зупинити воркерів."""
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Не відправлено {self._queue.qsize()} сповіщень при зупинці")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    async def _wait_global_slot(self):
+        loop = asyncio.get_running_loop()
+        async with self._rate_lock:
+            now = loop.time()
+            slot = max(now, self._next_global_slot, self._paused_until)
+            self._next_global_slot = slot + self.global_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _worker(self):
+        while True:
+            chat_id, text, kwargs, callback = await self._queue.get()
+            error = None
+            try:
+                await self._deliver(chat_id, text, kwargs)
+            except Exception as e:
+                error = e
+                self.failed += 1
+                logging.exception(f"Не вдалося надіслати сповіщення в чат {chat_id}: {e}")
+            finally:
+                self._queue.task_done()
+            if callback is not None:
+                try:
+                    callback(error)
+                except Exception as e:
+                    logging.exception(f"Помилка обробки результату сповіщення: {e}")
+
+    async def _deliver(self, chat_id, text: str, kwargs: dict):
+        loop = asyncio.get_running_loop()
+        # Повідомлення в один чат ідуть по черзі й у порядку надходження
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            for attempt in range(1, self.max_attempts + 1):
+                delay = self._chat_next_slot.get(chat_id, 0.0) - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._wait_global_slot()
+                try:
+                    await self.bot.send_message(chat_id, text, **kwargs)
+                except RetryAfter as e:
+                    self.retried += 1
+                    self._paused_until = max(self._paused_until, loop.time() + e.timeout)
+                    logging.warning(f"Telegram просить зачекати {e.timeout} с (чат {chat_id})")
+                    continue
+                except (NetworkError, RestartingTelegram) as e:
+                    if attempt == self.max_attempts:
+                        raise
+                    self.retried += 1
+                    logging.warning(f"Тимчасова помилка відправки в чат {chat_id}: {e}")
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                self.sent += 1
+                self._chat_next_slot[chat_id] = loop.time() + self.chat_interval
+                break
+            else:
+                raise RuntimeError(f"вичерпано {self.max_attempts} спроб")
+        self._prune_chats(loop.time())
+
+    def _prune_chats(self, now: float):
+        # Прибираємо чати, по яких немає відправок і вже минув інтервал
+        if len(self._chat_next_slot) < 1000:
+            return
+        for chat_id, slot in list(self._chat_next_slot.items()):
+            lock = self._chat_locks.get(chat_id)
+            if slot <= now and (lock is None or not lock.locked()):
+                self._chat_next_slot.pop(chat_id, None)
+                self._chat_locks.pop(chat_id, None)
+
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "8"))
+# Telegram: ~30 повідомлень/с на бота і ~1/с в один приватний чат
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))
+NOTIFY_CHAT_INTERVAL = float(os.getenv("NOTIFY_CHAT_INTERVAL_SECONDS", "1.0"))
+NOTIFIER = NotificationDispatcher(bot, NOTIFY_WORKERS, NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_INTERVAL)
+
+############################################
+# ВЕРСІЯ РОЗКЛАДКИ ЛИСТА 1 (ВИДАЛЕННЯ РЯДКІВ)
+############################################
 
-def pause_polling():
-    global POLLING_PAUSED
-    POLLING_PAUSED = True
+class SheetLayout:
+    """
+    Лічильник змін розкладки листа 1. Видалення рядка зсуває всі рядки нижче,
+    тож поллер, який прочитав лист до або під час видалення, не повинен
+    зіставляти з заявками рядки, починаючи з видаленого. Решта рядків
+    обробляється як завжди — глобальної паузи немає.
+    """
 
-def resume_polling():
-    global POLLING_PAUSED
-    POLLING_PAUSED = False
+    # Скільки останніх видалень пам'ятаємо; старіші знімки вважаються повністю застарілими
+    HISTORY = 256
+
+    def __init__(self):
+        self.version = 0
+        self._deleting = {}
+        self._history = []
+
+    def begin_delete(self, row: int):
+        self._deleting[row] = self._deleting.get(row, 0) + 1
+
+    def end_delete(self, row: int):
+        self.version += 1
+        self._history.append((self.version, row))
+        del self._history[:-self.HISTORY]
+        self._deleting[row] -= 1
+        if not self._deleting[row]:
+            del self._deleting[row]
+
+    def unstable_from(self, since_version: int):
+        """
+        Перший рядок, з якого дані, прочитані на версії since_version, вже не можна
+        зіставляти за номером рядка (None — усі рядки актуальні).
+        """
+        rows = list(self._deleting)
+        if self._history and since_version < self._history[0][0] - 1:
+            return 2
+        rows.extend(row for version, row in self._history if version > since_version)
+        return min(rows) if rows else None
+
+SHEET1_LAYOUT = SheetLayout()
 
 ############################################
 # КЛАСИ СТАНІВ (FSM)
@@ -225,6 +418,8 @@ class AdminReview(StatesGroup):
     viewing_deleted_list = State()
     viewing_deleted_app = State()
     confirm_deletion_app = State()
+    bulk_deletion_input = State()
+    bulk_deletion_confirm = State()
     viewing_approved_list = State()
     viewing_approved_user = State()
     editing_approved_user = State()
@@ -234,128 +429,1840 @@ class AdminReview(StatesGroup):
     editing_single_application = State()
     select_new_status = State()
 
+############################################
+# ПУЛИ ПОТОКІВ ДЛЯ БЛОКУЮЧИХ ОПЕРАЦІЙ (GSheets, ДИСК)
+############################################
+
+class BlockingExecutor:
+    """
+    Обмежений пул потоків для блокуючих викликів (Google Sheets, файли).
+    Корутини бота віддають сюди синхронні функції й не блокують event loop.
+    Ведеться облік черги: скільки задач чекає на вільний потік, скільки
+    виконується зараз, а також середній і максимальний час очікування —
+    за цими цифрами підбирається розмір пулу.
+    Черга пріоритетна: вільний потік бере задачу з найменшим priority,
+    за однакового пріоритету — у порядку надходження.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        # (priority, порядковий_номер, Future, виклик)
+        self._pending = []
+        self._seq = itertools.count()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.deferred = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, func, *args, **kwargs):
+        return self.submit_priority(0, func, *args, **kwargs)
+
+    def submit_priority(self, priority: int, func, *args, **kwargs):
+        submitted_at = time.monotonic()
+
+        def call():
+            wait = time.monotonic() - submitted_at
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                return func(*args, **kwargs)
+            except SheetsRetryLater:
+                # Не помилка: виклик повториться з event loop
+                with self._lock:
+                    self.deferred += 1
+                raise
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        future = Future()
+        with self._lock:
+            self.queued += 1
+            heapq.heappush(self._pending, (priority, next(self._seq), future, call))
+        # Кожна задача додає в пул один запуск, а той бере найважливішу з черги
+        self._executor.submit(self._run_next)
+        return future
+
+    def _run_next(self):
+        with self._lock:
+            _, _, future, call = heapq.heappop(self._pending)
+        if not future.set_running_or_notify_cancel():
+            with self._lock:
+                self.queued -= 1
+            return
+        try:
+            result = call()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    async def run(self, func, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    async def run_priority(self, priority: int, func, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit_priority(priority, func, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "deferred": self.deferred,
+                "avg_wait_ms": round(self.total_wait / started * 1000, 1) if started else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+SHEETS_WORKERS = int(os.getenv("SHEETS_WORKERS", "4"))
+SHEETS_POOL = BlockingExecutor("sheets", SHEETS_WORKERS)
+# Один потік: записи на диск виконуються строго в порядку надходження
+DISK_POOL = BlockingExecutor("disk", 1)
+# Окремий потік для формування файлів вивантаження, щоб довгий експорт не затримував DISK_POOL
+EXPORT_POOL = BlockingExecutor("export", 1)
+
+# Пріоритет викликів Google Sheets при спільній квоті: менше — важливіше
+SHEETS_PRIORITY_ADMIN = 0
+SHEETS_PRIORITY_USER = 1
+SHEETS_PRIORITY_BACKGROUND = 2
+
+class SheetsRetryLater(Exception):
+    """
+    Виклик у SHEETS_POOL треба перезапустити пізніше: немає маркера квоти (limiter)
+    або запит отримав 429/5xx (error). Чекання відбувається на event loop у run_sheets,
+    а не в потоці пулу.
+    """
+
+    def __init__(self, limiter=None, error=None, retry_after=None):
+        super().__init__(str(error) if error is not None else f"квота {limiter.name} вичерпана")
+        self.limiter = limiter
+        self.error = error
+        self.retry_after = retry_after
+
+# Контекст поточного виклику в потоці пулу — його бачить QuotaAwareClient:
+# priority; restartable — виклик ще можна перезапустити (жоден його запит ще
+# не виконано); prepaid — лімітер, маркер якого вже отримано на event loop
+_sheets_call_context = threading.local()
+
+def _run_with_priority(priority: int, prepaid, func, *args, **kwargs):
+    context = _sheets_call_context
+    context.priority, context.restartable, context.prepaid = priority, True, prepaid
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if context.prepaid is not None:
+            # Маркер не знадобився (виклик пішов іншим шляхом) — повертаємо
+            context.prepaid.refund()
+        context.priority, context.restartable, context.prepaid = SHEETS_PRIORITY_USER, False, None
+
+async def run_sheets(func, *args, priority: int = SHEETS_PRIORITY_USER, **kwargs):
+    """
+    Виконати синхронний виклик gspread у пулі SHEETS_POOL.
+    priority визначає черговість у пулі і при вичерпаній квоті Sheets (див. QuotaLimiter).
+    Маркер квоти і затримка перед повтором після 429/5xx очікуються тут, на event loop,
+    тож потоки пулу не простоюють і не затримують важливіші виклики.
+    Після остаточної помилки кеш дескрипторів таблиць скидається, і наступний виклик відкриє їх заново.
+    """
+    attempt = 0
+    prepaid = None
+    while True:
+        try:
+            return await SHEETS_POOL.run_priority(priority, _run_with_priority, priority, prepaid, func, *args, **kwargs)
+        except SheetsRetryLater as retry:
+            prepaid = None
+            if retry.limiter is not None:
+                await retry.limiter.acquire_async(priority)
+                prepaid = retry.limiter
+                continue
+            attempt += 1
+            if attempt > SHEETS_MAX_RETRIES:
+                SHEETS_RETRY_STATS["gave_up"] += 1
+                invalidate_gspread_cache()
+                raise retry.error
+            SHEETS_RETRY_STATS["retries"] += 1
+            delay = sheets_backoff_delay(attempt, retry.retry_after)
+            logging.warning(f"Sheets API: {retry.error}; повтор {attempt}/{SHEETS_MAX_RETRIES} через {delay:.1f} с")
+            await asyncio.sleep(delay)
+        except Exception:
+            invalidate_gspread_cache()
+            raise
+
+async def run_disk(func, *args, **kwargs):
+    """Виконати синхронну файлову операцію у пулі DISK_POOL."""
+    return await DISK_POOL.run(func, *args, **kwargs)
+
+def _log_failed_write(future):
+    if future.exception() is not None:
+        logging.error(f"Помилка фонового запису на диск: {future.exception()}")
+
+def submit_disk_write(path, text: str):
+    """
+    Запис файлу у фоні (без очікування). Поза event loop пишемо одразу,
+    щоб скрипти обслуговування отримували файл синхронно.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        write_text_atomic(path, text)
+        return
+    DISK_POOL.submit(write_text_atomic, path, text).add_done_callback(_log_failed_write)
+
+def get_pool_stats() -> dict:
+    return {"sheets_pool": SHEETS_POOL.stats(), "disk_pool": DISK_POOL.stats(), "export_pool": EXPORT_POOL.stats()}
+
 ############################################
 # ФУНКЦІЇ РОБОТИ З ЛОКАЛЬНИМИ JSON-ФАЙЛАМИ
 ############################################
 
-def load_users():
-    with open(USERS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+def write_text_temp(path, text: str) -> str:
+    """Записує text (з fsync) у тимчасовий файл поруч із path і повертає його шлях."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def write_text_atomic(path, text: str):
+    """Записує файл через тимчасовий, щоб обрив запису не зіпсував основний файл."""
+    tmp_path = write_text_temp(path, text)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
-def save_users(data):
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def write_json_atomic(path, data):
+    write_text_atomic(path, json.dumps(data, indent=2, ensure_ascii=False))
 
-def load_applications():
-    with open(APPLICATIONS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+class JsonUserStore:
+    """
+    Користувачі у users.json: approved_users / pending_users (uid -> дані)
+    та blocked_users (список uid). Файл читається один раз і далі
+    обслуговується з пам'яті; кожна зміна записується на диск у фоні (DISK_POOL).
+    """
 
-def save_applications(apps):
-    with open(APPLICATIONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(apps, f, indent=2, ensure_ascii=False)
+    def __init__(self, path: str):
+        self.path = path
+        self._data = None
+
+    def init(self):
+        self.load()
+
+    def load(self) -> dict:
+        if self._data is None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        return self._data
+
+    def save(self, data: dict):
+        self._data = data
+        submit_disk_write(self.path, json.dumps(data, indent=2, ensure_ascii=False))
+
+    def get_status(self, uid: str):
+        data = self.load()
+        if uid in data.get("blocked_users", []):
+            return "blocked"
+        if uid in data.get("approved_users", {}):
+            return "approved"
+        if uid in data.get("pending_users", {}):
+            return "pending"
+        return None
+
+    def get(self, uid: str, status: str):
+        return self.load().get(f"{status}_users", {}).get(uid)
+
+    def list(self, status: str) -> dict:
+        return dict(self.load().get(f"{status}_users", {}))
+
+    def set(self, uid: str, status: str, info: dict = None):
+        """Переносить користувача у вказаний статус (з усіх інших він прибирається)."""
+        data = self.load()
+        data.get("pending_users", {}).pop(uid, None)
+        data.get("approved_users", {}).pop(uid, None)
+        if uid in data.get("blocked_users", []):
+            data["blocked_users"].remove(uid)
+        if status == "blocked":
+            data.setdefault("blocked_users", []).append(uid)
+        else:
+            data.setdefault(f"{status}_users", {})[uid] = info or {}
+        self.save(data)
+
+    def update(self, uid: str, status: str, fields: dict) -> bool:
+        data = self.load()
+        info = data.get(f"{status}_users", {}).get(uid)
+        if info is None:
+            return False
+        info.update(fields)
+        self.save(data)
+        return True
+
+    def remove(self, uid: str, status: str) -> bool:
+        data = self.load()
+        if data.get(f"{status}_users", {}).pop(uid, None) is None:
+            return False
+        self.save(data)
+        return True
+
+class ApplicationStore:
+    """
+    Процесне сховище заявок у пам'яті з журналом змін (WAL).
+
+    Знімок applications_by_user.json читається один раз при старті, після чого
+    на нього накочуються записи журналу. Кожна зміна (нова заявка, зміна полів,
+    остаточне видалення, зсув sheet_row) дописується в журнал одним коротким
+    рядком JSON, тож вартість запису залежить від розміру зміни, а не від розміру
+    бази. На event loop рядок лише передається ОС, fsync виконується у DISK_POOL
+    (кілька записів поспіль — один fsync). У фоні журнал періодично стискається
+    у новий знімок (запис файлів — теж у DISK_POOL).
+    Обірваний під час збою останній рядок журналу при старті відкидається.
+
+    Паралельно підтримуються індекси sheet_row -> {(uid, app_index)},
+    request_number -> (uid, app_index) та proposal_status -> {(uid, app_index)},
+    щоб пошук заявки за рядком / номером у таблиці і списки заявок за статусом
+    не перебирали всі заявки, а також множина старих заявок (sheet_row без request_number),
+    яким при видаленні рядків листа 1 ще треба зсувати sheet_row.
+    """
+
+    # Номер останнього запису журналу, що вже увійшов у знімок
+    SEQ_KEY = "_journal_seq"
+    # Ще не доставлені сповіщення (outbox) у знімку
+    OUTBOX_KEY = "_outbox"
+    # Службові значення (напр., лічильник номерів заявок) у знімку
+    META_KEY = "_meta"
+
+    def __init__(self, path: str, journal_path: str, compact_interval: float,
+                 compact_records: int, fsync: bool = True):
+        self.path = path
+        self.journal_path = journal_path
+        self.compact_interval = compact_interval
+        self.compact_records = compact_records
+        self.fsync = fsync
+        self._apps = None
+        self._seq = 0
+        self._journal = None
+        self._journal_records = 0
+        self._dirty = False
+        self._compact_handle = None
+        # Поки знімок пишеться у фоні — рядки журналу, що з'явилися за цей час
+        self._compacting_lines = None
+        # Останній seq, що вже гарантовано на диску; фонове завдання fsync
+        self._synced_seq = 0
+        self._sync_task = None
+        # Змінюється при заміні файлу журналу: fsync старого файлу не покриває новий
+        self._journal_generation = 0
+        self._row_index = {}
+        self._request_index = {}
+        self._status_index = {}
+        self._legacy_index = {}
+        # key -> повідомлення; додається тим самим записом журналу, що й зміна заявки
+        self._outbox = {}
+        self._meta = {}
+
+    @property
+    def apps(self) -> dict:
+        if self._apps is None:
+            self.load()
+        return self._apps
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._seq = data.pop(self.SEQ_KEY, 0)
+        self._outbox = {msg["key"]: msg for msg in data.pop(self.OUTBOX_KEY, [])}
+        self._meta = data.pop(self.META_KEY, {})
+        self._apps = data
+        self._reindex()
+        replayed = self._replay_journal()
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._synced_seq = self._seq
+        self._dirty = False
+        if replayed:
+            self.mark_dirty()
+        logging.info(
+            f"Завантажено заявки {sum(len(v) for v in self._apps.values())} шт. з {self.path} "
+            f"(накочено записів журналу: {replayed})"
+        )
+
+    def _replay_journal(self) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+        snapshot_seq = self._seq
+        replayed = 0
+        good_offset = 0
+        self._journal_records = 0
+        with open(self.journal_path, "rb") as f:
+            for raw in f:
+                try:
+                    if not raw.endswith(b"\n"):
+                        raise ValueError("обірваний запис")
+                    record = json.loads(raw)
+                except ValueError as e:
+                    logging.warning(f"Журнал заявок пошкоджено після зміщення {good_offset}: {e}. Решту відкинуто.")
+                    break
+                good_offset += len(raw)
+                self._journal_records += 1
+                if record["seq"] <= snapshot_seq:
+                    continue
+                self._apply(record)
+                self._seq = record["seq"]
+                replayed += 1
+        if good_offset < os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_offset)
+        return replayed
+
+    def _reindex(self):
+        self._row_index = {}
+        self._request_index = {}
+        self._status_index = {}
+        self._legacy_index = {}
+        for uid, user_apps in self._apps.items():
+            for idx, app in enumerate(user_apps):
+                self._index_app(uid, idx, app)
+
+    def _index_app(self, uid: str, idx: int, app: dict):
+        sheet_row = app.get("sheet_row")
+        if sheet_row:
+            # Кілька заявок можуть посилатися на один рядок (дублікати старих записів)
+            self._row_index.setdefault(sheet_row, {})[(uid, idx)] = None
+        request_number = app.get("request_number")
+        if request_number:
+            self._request_index[request_number] = (uid, idx)
+        elif sheet_row:
+            self._legacy_index[(uid, idx)] = None
+        # dict як впорядкована множина: список за статусом зберігає порядок появи
+        self._status_index.setdefault(app.get("proposal_status"), {})[(uid, idx)] = None
+
+    def _unindex_app(self, uid: str, idx: int, app: dict):
+        sheet_row = app.get("sheet_row")
+        refs = self._row_index.get(sheet_row)
+        if refs is not None:
+            refs.pop((uid, idx), None)
+            if not refs:
+                del self._row_index[sheet_row]
+        request_number = app.get("request_number")
+        if request_number and self._request_index.get(request_number) == (uid, idx):
+            del self._request_index[request_number]
+        self._legacy_index.pop((uid, idx), None)
+        self._status_index.get(app.get("proposal_status"), {}).pop((uid, idx), None)
+
+    def _apply(self, record: dict):
+        op = record["op"]
+        apps = self._apps
+        if op == "add":
+            uid = record["uid"]
+            user_apps = apps.setdefault(uid, [])
+            record["app"].setdefault("version", 1)
+            user_apps.append(record["app"])
+            self._index_app(uid, len(user_apps) - 1, record["app"])
+        elif op == "set":
+            self._set_fields(record["uid"], record["idx"], record["fields"])
+        elif op == "set_many":
+            for uid, idx, fields in record["items"]:
+                self._set_fields(uid, idx, fields)
+        elif op == "remove":
+            self._remove_at(record["uid"], record["idx"])
+        elif op == "remove_many":
+            # Для кожного користувача — від більшого індексу до меншого, щоб індекси не зсувались
+            for uid, idx in sorted(record["refs"], key=lambda ref: (ref[0], -ref[1])):
+                self._remove_at(uid, idx)
+        elif op == "shift_rows" and "removed" in record:
+            # Видалені рядки листа 1: sheet_row зсувається лише у старих заявок без request_number
+            removed = record["removed"]
+            removed_set = set(removed)
+            for uid, idx in list(self._legacy_index):
+                app = apps[uid][idx]
+                old_row = app["sheet_row"]
+                if old_row < removed[0]:
+                    continue
+                self._unindex_app(uid, idx, app)
+                # Рядок заявки видалено разом з іншою заявкою — прив'язки до листа більше немає
+                app["sheet_row"] = None if old_row in removed_set else old_row - bisect.bisect_left(removed, old_row)
+                self._index_app(uid, idx, app)
+        elif op == "shift_rows":
+            # Формат старих журналів: зсув усіх заявок нижче after на delta
+            after_row, delta = record["after"], record["delta"]
+            for user_apps in apps.values():
+                for app in user_apps:
+                    old_row = app.get("sheet_row", 0)
+                    if old_row and old_row > after_row:
+                        app["sheet_row"] = old_row + delta
+            # Зсунуті рядки можуть злитися з незсунутими — індекс рядків будуємо заново
+            self._row_index = {}
+            for uid, user_apps in apps.items():
+                for idx, app in enumerate(user_apps):
+                    if app.get("sheet_row"):
+                        self._row_index.setdefault(app["sheet_row"], {})[(uid, idx)] = None
+        elif op == "outbox_ack":
+            for key in record["keys"]:
+                self._outbox.pop(key, None)
+        elif op == "meta":
+            self._meta[record["key"]] = record["value"]
+        else:
+            raise ValueError(f"Невідома операція журналу: {op}")
+        for msg in record.get("outbox", ()):
+            self._outbox.setdefault(msg["key"], msg)
+
+    def _set_fields(self, uid: str, idx: int, fields: dict):
+        app = self._apps[uid][idx]
+        if fields.keys() & {"sheet_row", "request_number", "proposal_status"}:
+            self._unindex_app(uid, idx, app)
+            app.update(fields)
+            self._index_app(uid, idx, app)
+        else:
+            app.update(fields)
+        # Версія виводиться з журналу, тож після відтворення вона та сама
+        app["version"] = app.get("version", 0) + 1
+
+    def _remove_at(self, uid: str, removed_idx: int):
+        user_apps = self._apps[uid]
+        # Індекси наступних заявок користувача зсуваються на 1 вниз
+        for idx in range(removed_idx, len(user_apps)):
+            self._unindex_app(uid, idx, user_apps[idx])
+        del user_apps[removed_idx]
+        for idx in range(removed_idx, len(user_apps)):
+            self._index_app(uid, idx, user_apps[idx])
+        if not user_apps:
+            self._apps.pop(uid, None)
+
+    def _commit(self, record: dict, sync: bool = True):
+        """
+        Дописує запис у журнал і застосовує його. fsync на event loop не виконується:
+        його робить фонове завдання у DISK_POOL (_sync_soon). sync=False — фонового
+        fsync не треба, викликач сам чекає sync_journal.
+        """
+        self.apps  # гарантуємо, що знімок і журнал відкриті
+        record["seq"] = self._seq + 1
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._journal.write(line)
+        self._journal.flush()
+        if self._compacting_lines is not None:
+            self._compacting_lines.append(line)
+        self._seq = record["seq"]
+        self._journal_records += 1
+        self._apply(record)
+        if self.fsync and sync:
+            self._sync_soon()
+        self.mark_dirty()
+        if self._journal_records >= self.compact_records:
+            self._schedule_compaction(delay=0)
+
+    def _sync_soon(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Поза event loop (скрипти обслуговування) — fsync одразу
+            os.fsync(self._journal.fileno())
+            self._synced_seq = self._seq
+            return
+        if self._sync_task is None:
+            self._sync_task = asyncio.ensure_future(self._sync_pending())
+
+    async def _sync_pending(self):
+        """Фоновий fsync: поки виконується один, нові записи чекають наступного."""
+        try:
+            while self._journal is not None and self._synced_seq < self._seq:
+                await self.sync_journal()
+        except Exception as e:
+            logging.error(f"Помилка fsync журналу заявок: {e}")
+        finally:
+            self._sync_task = None
+
+    def _exists(self, uid: str, idx: int) -> bool:
+        return uid in self.apps and idx is not None and 0 <= idx < len(self._apps[uid])
+
+    def get_user_apps(self, uid: str) -> list:
+        return self.apps.get(uid, [])
+
+    def get(self, uid: str, idx: int):
+        return self._apps[uid][idx] if self._exists(uid, idx) else None
+
+    def find_by_sheet_row(self, sheet_row: int) -> list:
+        apps = self.apps
+        return [(uid, idx, apps[uid][idx]) for uid, idx in self._row_index.get(sheet_row, {})]
+
+    def find_by_request_number(self, request_number: str):
+        apps = self.apps
+        ref = self._request_index.get(request_number)
+        if ref is None:
+            return None
+        uid, idx = ref
+        return uid, idx, apps[uid][idx]
+
+    def list_by_status(self, status: str) -> list:
+        apps = self.apps
+        return [(uid, idx, apps[uid][idx]) for uid, idx in self._status_index.get(status, {})]
+
+    def list_legacy(self) -> list:
+        """Старі заявки: (uid, app_index, app) з sheet_row, але без request_number."""
+        apps = self.apps
+        return [(uid, idx, apps[uid][idx]) for uid, idx in self._legacy_index]
+
+    def iter_snapshot(self):
+        """
+        Ітератор (uid, копія_заявки) по всіх заявках, який можна споживати в іншому потоці.
+        Викликається на event loop: тут фіксуються лише списки посилань, самі заявки
+        копіюються по одній під час ітерації.
+        """
+        refs = [(uid, list(user_apps)) for uid, user_apps in self.apps.items()]
+
+        def generate():
+            for uid, user_apps in refs:
+                for app in user_apps:
+                    yield uid, dict(app)
+
+        return generate()
+
+    def user_app_stats(self) -> dict:
+        """{uid: (кількість_заявок, найпізніший_timestamp)} — один прохід по всіх заявках."""
+        return {
+            uid: (len(user_apps), max((app.get("timestamp", "") for app in user_apps), default=""))
+            for uid, user_apps in self.apps.items()
+        }
+
+    def add(self, uid: str, app: dict):
+        self._commit({"op": "add", "uid": uid, "app": app})
+
+    def update(self, uid: str, idx: int, fields: dict, expected_version: int = None,
+               outbox: list = None) -> bool:
+        """
+        Змінює поля заявки. Якщо задано expected_version, а заявку вже змінив хтось інший
+        (версія не збігається), нічого не записує і повертає False.
+        outbox — сповіщення ({"key", "chat_id", "text"}), що фіксуються тим самим записом журналу.
+        """
+        if not self._exists(uid, idx):
+            return False
+        if expected_version is not None and self._apps[uid][idx].get("version", 0) != expected_version:
+            return False
+        record = {"op": "set", "uid": uid, "idx": idx, "fields": fields}
+        if outbox:
+            record["outbox"] = outbox
+        self._commit(record)
+        return True
+
+    async def update_many(self, items: list) -> int:
+        """
+        Пакетна зміна полів [(uid, app_index, fields, expected_version), ...] одним записом
+        журналу; fsync — у DISK_POOL. Заявки, які тим часом змінилися, пропускаються.
+        Повертає кількість змінених заявок.
+        """
+        items = [
+            [uid, idx, fields] for uid, idx, fields, expected_version in items
+            if self._exists(uid, idx) and self._apps[uid][idx].get("version", 0) == expected_version
+        ]
+        if not items:
+            return 0
+        self._commit({"op": "set_many", "items": items}, sync=False)
+        await self.sync_journal()
+        return len(items)
+
+    async def sync_journal(self):
+        """Чекає, доки всі записані рядки журналу опиняться на диску (fsync у DISK_POOL)."""
+        if not self.fsync or self._journal is None or self._synced_seq >= self._seq:
+            return
+        seq, generation = self._seq, self._journal_generation
+        # Копія дескриптора: стискання може тим часом закрити й замінити файл журналу
+        fd = os.dup(self._journal.fileno())
+        try:
+            await run_disk(os.fsync, fd)
+        finally:
+            os.close(fd)
+        if generation == self._journal_generation:
+            self._synced_seq = max(self._synced_seq, seq)
+
+    def pending_outbox(self) -> list:
+        self.apps
+        return list(self._outbox.values())
+
+    def ack_outbox(self, keys: list):
+        """Прибрати доставлені сповіщення (один запис журналу на всю пачку)."""
+        keys = [key for key in keys if key in self._outbox]
+        if keys:
+            self._commit({"op": "outbox_ack", "keys": keys})
+
+    def get_meta(self, key: str, default=None):
+        self.apps
+        return self._meta.get(key, default)
+
+    def set_meta(self, key: str, value):
+        if self.get_meta(key) != value:
+            self._commit({"op": "meta", "key": key, "value": value})
+
+    def remove(self, uid: str, idx: int):
+        if not self._exists(uid, idx):
+            return None
+        app = self._apps[uid][idx]
+        self._commit({"op": "remove", "uid": uid, "idx": idx})
+        return app
+
+    def remove_many(self, refs: list) -> list:
+        """Остаточно видаляє кілька заявок [(uid, idx), ...] одним записом журналу."""
+        refs = sorted({(uid, idx) for uid, idx in refs if self._exists(uid, idx)})
+        if not refs:
+            return []
+        removed = [self._apps[uid][idx] for uid, idx in refs]
+        self._commit({"op": "remove_many", "refs": [list(ref) for ref in refs]})
+        return removed
+
+    def shift_sheet_rows(self, removed_rows: list):
+        """Після видалення рядків листа 1 зсуває sheet_row старих заявок (без request_number)."""
+        apps = self.apps  # індекс старих заявок будується під час завантаження
+        removed = sorted(set(removed_rows))
+        if removed and any(apps[uid][idx]["sheet_row"] >= removed[0] for uid, idx in self._legacy_index):
+            self._commit({"op": "shift_rows", "removed": removed})
+
+    def replace(self, apps: dict):
+        self._apps = apps
+        self._reindex()
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        self._dirty = True
+        self._schedule_compaction()
+
+    def _schedule_compaction(self, delay: float = None):
+        if self._compacting_lines is not None:
+            # Стискання вже йде; після нього перевіримо _dirty ще раз
+            return
+        if self._compact_handle is not None:
+            if delay is None:
+                return
+            self._compact_handle.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Поза event loop (напр., скрипти обслуговування) — стискаємо одразу
+            self._compact_handle = None
+            self.compact()
+            return
+        self._compact_handle = loop.call_later(
+            self.compact_interval if delay is None else delay, self._compact_from_timer
+        )
 
-def add_application(user_id, chat_id, application_data):
+    def _compact_from_timer(self):
+        self._compact_handle = None
+        asyncio.ensure_future(self.compact_async())
+
+    def _snapshot_state(self) -> dict:
+        """
+        Копія стану для знімка. На event loop лише поверхнево копіюються словники
+        заявок (вкладені значення замінюються цілком, а не змінюються на місці),
+        серіалізація виконується в DISK_POOL разом із записом файлу.
+        """
+        state = {self.SEQ_KEY: self._seq, self.OUTBOX_KEY: list(self._outbox.values()),
+                 self.META_KEY: dict(self._meta)}
+        for uid, user_apps in self._apps.items():
+            state[uid] = [dict(app) for app in user_apps]
+        return state
+
+    @staticmethod
+    def _write_snapshot(path: str, state: dict):
+        write_text_atomic(path, json.dumps(state, indent=2, ensure_ascii=False))
+
+    def _finish_compaction(self, tmp_path: str, written: int, seq: int):
+        """
+        Знімок уже на диску, tmp_path — новий журнал з першими written рядками, що
+        з'явилися під час стискання (до seq включно, уже з fsync). Рядки, дописані
+        після цього, додаються в кінець, і файл атомарно замінює журнал. Якщо впадемо
+        раніше — записи з seq <= SEQ_KEY при старті просто пропускаються.
+        """
+        lines, self._compacting_lines = self._compacting_lines, None
+        late_lines = lines[written:]
+        if late_lines:
+            with open(tmp_path, "a", encoding="utf-8") as f:
+                f.write("".join(late_lines))
+        os.replace(tmp_path, self.journal_path)
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_records = len(lines)
+        self._journal_generation += 1
+        self._synced_seq = seq
+        if late_lines and self.fsync:
+            self._sync_soon()
+        else:
+            self._synced_seq = self._seq
+
+    async def compact_async(self):
+        """Стискання у фоні: на event loop — лише копія стану, серіалізація і запис файлів — у DISK_POOL."""
+        if not self._dirty or self._apps is None or self._compacting_lines is not None:
+            return
+        state = self._snapshot_state()
+        pending_lines = self._compacting_lines = []
+        self._dirty = False
+        tmp_path = None
+        try:
+            await run_disk(self._write_snapshot, self.path, state)
+            if self._compacting_lines is pending_lines:
+                written, seq = len(pending_lines), self._seq
+                tmp_path = await run_disk(write_text_temp, self.journal_path, "".join(pending_lines))
+        except Exception as e:
+            logging.exception(f"Помилка стискання журналу заявок: {e}")
+            if self._compacting_lines is pending_lines:
+                self._compacting_lines = None
+            # Повторимо спробу на наступному таймері
+            self.mark_dirty()
+            return
+        if self._compacting_lines is not pending_lines:
+            # Тим часом відбулося синхронне стискання (зупинка бота)
+            if tmp_path is not None:
+                os.remove(tmp_path)
+            return
+        self._finish_compaction(tmp_path, written, seq)
+        if self._dirty:
+            self._schedule_compaction()
+
+    def compact(self):
+        """
+        Синхронно записує новий знімок і очищує журнал (при зупинці бота).
+        Запис теж іде через DISK_POOL — після знімка фонового стискання, якщо той
+        ще в черзі, тож старіший знімок не ляже поверх новішого, коли журнал уже очищено.
+        """
+        if self._compact_handle is not None:
+            self._compact_handle.cancel()
+            self._compact_handle = None
+        if self._apps is None or (not self._dirty and self._compacting_lines is None):
+            return
+        state = self._snapshot_state()
+        self._compacting_lines = []
+        self._dirty = False
+        DISK_POOL.submit(self._write_snapshot, self.path, state).result()
+        tmp_path = DISK_POOL.submit(write_text_temp, self.journal_path, "").result()
+        self._finish_compaction(tmp_path, 0, self._seq)
+
+    def close(self):
+        self.compact()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+############################################
+# SQLITE-СХОВИЩЕ (ОПЦІЙНО, STORAGE_BACKEND=sqlite)
+############################################
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_status ON users(status);
+
+CREATE TABLE IF NOT EXISTS applications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    sheet_row INTEGER,
+    proposal_status TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_applications_user ON applications(user_id, position);
+CREATE INDEX IF NOT EXISTS idx_applications_sheet_row ON applications(sheet_row);
+CREATE INDEX IF NOT EXISTS idx_applications_status ON applications(proposal_status);
+CREATE INDEX IF NOT EXISTS idx_applications_timestamp ON applications(timestamp);
+CREATE INDEX IF NOT EXISTS idx_applications_request_number
+    ON applications(json_extract(data, '$.request_number'));
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+def open_sqlite_database(path: str):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SQLITE_SCHEMA)
+    return conn
+
+def sqlite_import_once(conn, key: str, table: str, import_legacy) -> bool:
+    """
+    Одноразове перенесення JSON-файлу в таблицю table: факт перенесення фіксується
+    в meta (key), тож порожня таблиця (усе видалили) не заповнюється старим файлом знову.
+    Бази, перенесені до появи позначки, впізнаються за непорожньою таблицею.
+    Повертає True, якщо import_legacy виконано.
+    """
+    if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+        return False
+    imported = not conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+    if imported:
+        import_legacy()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, data) VALUES (?, ?)", (key, json.dumps(True)))
+    return imported
+
+class SqliteUserStore:
+    """
+    Користувачі у таблиці users (status = approved / pending / blocked).
+    При першому запуску таблиця заповнюється з users.json (один раз, див. sqlite_import_once).
+    """
+
+    def __init__(self, conn, legacy_store: JsonUserStore):
+        self.conn = conn
+        self.legacy_store = legacy_store
+
+    MIGRATED_KEY = "migrated_users_json"
+
+    def init(self):
+        def import_legacy():
+            if os.path.exists(self.legacy_store.path):
+                self.save(self.legacy_store.load())
+                logging.info(f"Користувачів перенесено з {self.legacy_store.path} у SQLite.")
+
+        sqlite_import_once(self.conn, self.MIGRATED_KEY, "users", import_legacy)
+
+    def load(self) -> dict:
+        data = {"approved_users": {}, "blocked_users": [], "pending_users": {}}
+        for uid, status, info in self.conn.execute("SELECT user_id, status, data FROM users ORDER BY rowid"):
+            if status == "blocked":
+                data["blocked_users"].append(uid)
+            else:
+                data[f"{status}_users"][uid] = json.loads(info)
+        return data
+
+    def save(self, data: dict):
+        rows = [(uid, "approved", json.dumps(info, ensure_ascii=False))
+                for uid, info in data.get("approved_users", {}).items()]
+        rows += [(uid, "pending", json.dumps(info, ensure_ascii=False))
+                 for uid, info in data.get("pending_users", {}).items()]
+        rows += [(uid, "blocked", "{}") for uid in data.get("blocked_users", [])]
+        with self.conn:
+            self.conn.execute("DELETE FROM users")
+            self.conn.executemany("INSERT OR REPLACE INTO users (user_id, status, data) VALUES (?, ?, ?)", rows)
+
+    def get_status(self, uid: str):
+        row = self.conn.execute("SELECT status FROM users WHERE user_id = ?", (uid,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, uid: str, status: str):
+        row = self.conn.execute(
+            "SELECT data FROM users WHERE user_id = ? AND status = ?", (uid, status)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, status: str) -> dict:
+        return {
+            uid: json.loads(info)
+            for uid, info in self.conn.execute(
+                "SELECT user_id, data FROM users WHERE status = ? ORDER BY rowid", (status,)
+            )
+        }
+
+    def set(self, uid: str, status: str, info: dict = None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO users (user_id, status, data) VALUES (?, ?, ?)",
+                (uid, status, json.dumps(info or {}, ensure_ascii=False))
+            )
+
+    def update(self, uid: str, status: str, fields: dict) -> bool:
+        info = self.get(uid, status)
+        if info is None:
+            return False
+        info.update(fields)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE users SET data = ? WHERE user_id = ? AND status = ?",
+                (json.dumps(info, ensure_ascii=False), uid, status)
+            )
+        return True
+
+    def remove(self, uid: str, status: str) -> bool:
+        with self.conn:
+            cur = self.conn.execute("DELETE FROM users WHERE user_id = ? AND status = ?", (uid, status))
+        return cur.rowcount > 0
+
+class SqliteApplicationStore:
+    """
+    Заявки у таблиці applications: position — порядковий номер заявки
+    у списку користувача (той самий app_index, що й у JSON-сховищі),
+    sheet_row / proposal_status / timestamp винесені в індексовані колонки,
+    повні дані заявки лежать у колонці data (JSON).
+    При першому запуску таблиця заповнюється з applications_by_user.json
+    (один раз, див. sqlite_import_once).
+    """
+
+    MIGRATED_KEY = "migrated_applications_json"
+
+    def __init__(self, conn, legacy_store: ApplicationStore):
+        self.conn = conn
+        self.legacy_store = legacy_store
+        # Файл бази — для окремих з'єднань у потоках пулів (iter_snapshot, update_many)
+        self.path = conn.execute("PRAGMA database_list").fetchone()[2]
+
+    def load(self):
+        def import_legacy():
+            if os.path.exists(self.legacy_store.path):
+                self.replace(self.legacy_store.apps)
+                with self.conn:
+                    self._insert_outbox(self.legacy_store.pending_outbox())
+                logging.info(f"Заявки перенесено з {self.legacy_store.path} у SQLite.")
+
+        sqlite_import_once(self.conn, self.MIGRATED_KEY, "applications", import_legacy)
+
+    def close(self):
+        self.conn.close()
+
+    def mark_dirty(self):
+        # Кожна зміна одразу записується в БД
+        pass
+
+    @staticmethod
+    def _columns(app: dict):
+        return (
+            app.get("sheet_row"),
+            app.get("proposal_status"),
+            app.get("timestamp"),
+            json.dumps(app, ensure_ascii=False),
+        )
+
+    @property
+    def apps(self) -> dict:
+        apps = {}
+        for uid, data in self.conn.execute("SELECT user_id, data FROM applications ORDER BY user_id, position"):
+            apps.setdefault(uid, []).append(json.loads(data))
+        return apps
+
+    def replace(self, apps: dict):
+        rows = [
+            (uid, idx) + self._columns(app)
+            for uid, user_apps in apps.items()
+            for idx, app in enumerate(user_apps)
+        ]
+        with self.conn:
+            self.conn.execute("DELETE FROM applications")
+            self.conn.executemany(
+                "INSERT INTO applications (user_id, position, sheet_row, proposal_status, timestamp, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def get_user_apps(self, uid: str) -> list:
+        return [
+            json.loads(data)
+            for (data,) in self.conn.execute(
+                "SELECT data FROM applications WHERE user_id = ? ORDER BY position", (uid,)
+            )
+        ]
+
+    def get(self, uid: str, idx: int):
+        if idx is None:
+            return None
+        row = self.conn.execute(
+            "SELECT data FROM applications WHERE user_id = ? AND position = ?", (uid, idx)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_by_sheet_row(self, sheet_row: int) -> list:
+        return [
+            (uid, idx, json.loads(data))
+            for uid, idx, data in self.conn.execute(
+                "SELECT user_id, position, data FROM applications WHERE sheet_row = ? ORDER BY id", (sheet_row,)
+            )
+        ]
+
+    def find_by_request_number(self, request_number: str):
+        row = self.conn.execute(
+            "SELECT user_id, position, data FROM applications "
+            "WHERE json_extract(data, '$.request_number') = ? LIMIT 1", (request_number,)
+        ).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def list_by_status(self, status: str) -> list:
+        return [
+            (uid, idx, json.loads(data))
+            for uid, idx, data in self.conn.execute(
+                "SELECT user_id, position, data FROM applications WHERE proposal_status = ? "
+                "ORDER BY user_id, position",
+                (status,)
+            )
+        ]
+
+    def list_legacy(self) -> list:
+        return [
+            (uid, idx, json.loads(data))
+            for uid, idx, data in self.conn.execute(
+                "SELECT user_id, position, data FROM applications WHERE sheet_row IS NOT NULL "
+                "AND COALESCE(json_extract(data, '$.request_number'), '') = '' ORDER BY id"
+            )
+        ]
+
+    def iter_snapshot(self):
+        """
+        Ітератор (uid, заявка) по всіх заявках для споживання в іншому потоці:
+        читає через окреме з'єднання (у режимі WAL — узгоджений знімок), рядок за рядком.
+        """
+        path = self.path
+
+        def generate():
+            conn = sqlite3.connect(path)
+            try:
+                for uid, data in conn.execute(
+                    "SELECT user_id, data FROM applications ORDER BY user_id, position"
+                ):
+                    yield uid, json.loads(data)
+            finally:
+                conn.close()
+
+        return generate()
+
+    def user_app_stats(self) -> dict:
+        """{uid: (кількість_заявок, найпізніший_timestamp)} одним GROUP BY по idx_applications_user."""
+        return {
+            uid: (count, last or "")
+            for uid, count, last in self.conn.execute(
+                "SELECT user_id, COUNT(*), MAX(timestamp) FROM applications GROUP BY user_id"
+            )
+        }
+
+    def add(self, uid: str, app: dict):
+        app.setdefault("version", 1)
+        with self.conn:
+            (position,) = self.conn.execute(
+                "SELECT COUNT(*) FROM applications WHERE user_id = ?", (uid,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT INTO applications (user_id, position, sheet_row, proposal_status, timestamp, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (uid, position) + self._columns(app)
+            )
+
+    def update(self, uid: str, idx: int, fields: dict, expected_version: int = None,
+               outbox: list = None) -> bool:
+        app = self.get(uid, idx)
+        if app is None:
+            return False
+        version = app.get("version", 0)
+        if expected_version is not None and version != expected_version:
+            return False
+        app.update(fields)
+        app["version"] = version + 1
+        # Зміна заявки і її сповіщення — в одній транзакції
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE applications SET sheet_row = ?, proposal_status = ?, timestamp = ?, data = ? "
+                "WHERE user_id = ? AND position = ? AND COALESCE(json_extract(data, '$.version'), 0) = ?",
+                self._columns(app) + (uid, idx, version)
+            )
+            if cur.rowcount == 1 and outbox:
+                self._insert_outbox(outbox)
+        return cur.rowcount == 1
+
+    async def update_many(self, items: list) -> int:
+        """Пакетна зміна полів однією транзакцією в DISK_POOL (окреме з'єднання, перевірка версії)."""
+        if not items:
+            return 0
+        return await run_disk(self._update_many, self.path, items)
+
+    async def sync_journal(self):
+        # Кожна зміна фіксується транзакцією SQLite — чекати нічого
+        pass
+
+    @classmethod
+    def _update_many(cls, path: str, items: list) -> int:
+        conn = sqlite3.connect(path)
+        try:
+            updated = 0
+            with conn:
+                for uid, idx, fields, expected_version in items:
+                    row = conn.execute(
+                        "SELECT data FROM applications WHERE user_id = ? AND position = ?", (uid, idx)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    app = json.loads(row[0])
+                    if app.get("version", 0) != expected_version:
+                        continue
+                    app.update(fields)
+                    app["version"] = expected_version + 1
+                    cur = conn.execute(
+                        "UPDATE applications SET sheet_row = ?, proposal_status = ?, timestamp = ?, data = ? "
+                        "WHERE user_id = ? AND position = ? AND COALESCE(json_extract(data, '$.version'), 0) = ?",
+                        cls._columns(app) + (uid, idx, expected_version)
+                    )
+                    updated += cur.rowcount
+            return updated
+        finally:
+            conn.close()
+
+    def _insert_outbox(self, messages: list):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO outbox (key, data) VALUES (?, ?)",
+            [(msg["key"], json.dumps(msg, ensure_ascii=False)) for msg in messages]
+        )
+
+    def pending_outbox(self) -> list:
+        return [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM outbox ORDER BY id")]
+
+    def ack_outbox(self, keys: list):
+        if keys:
+            with self.conn:
+                self.conn.executemany("DELETE FROM outbox WHERE key = ?", [(key,) for key in keys])
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT data FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, data) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False))
+            )
+
+    def remove(self, uid: str, idx: int):
+        app = self.get(uid, idx)
+        if app is None:
+            return None
+        with self.conn:
+            self._delete_position(uid, idx)
+        return app
+
+    def _delete_position(self, uid: str, idx: int):
+        self.conn.execute("DELETE FROM applications WHERE user_id = ? AND position = ?", (uid, idx))
+        self.conn.execute(
+            "UPDATE applications SET position = position - 1 WHERE user_id = ? AND position > ?", (uid, idx)
+        )
+
+    def remove_many(self, refs: list) -> list:
+        refs = sorted({(uid, idx) for uid, idx in refs}, key=lambda ref: (ref[0], -ref[1]))
+        removed = []
+        with self.conn:
+            for uid, idx in refs:
+                app = self.get(uid, idx)
+                if app is not None:
+                    self._delete_position(uid, idx)
+                    removed.append(app)
+        return removed
+
+    def shift_sheet_rows(self, removed_rows: list):
+        removed = sorted(set(removed_rows))
+        if not removed:
+            return
+        moved = []
+        for app_id, old_row in self.conn.execute(
+            "SELECT id, sheet_row FROM applications WHERE sheet_row >= ? "
+            "AND COALESCE(json_extract(data, '$.request_number'), '') = ''", (removed[0],)
+        ).fetchall():
+            new_row = None if old_row in removed else old_row - bisect.bisect_left(removed, old_row)
+            moved.append((new_row, new_row, app_id))
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE applications SET sheet_row = ?, data = json_set(data, '$.sheet_row', ?) WHERE id = ?",
+                moved
+            )
+
+APPS_COMPACT_INTERVAL = float(os.getenv("APPS_COMPACT_INTERVAL_SECONDS", "300"))
+APPS_COMPACT_RECORDS = int(os.getenv("APPS_COMPACT_RECORDS", "5000"))
+APPS_JOURNAL_FSYNC = os.getenv("APPS_JOURNAL_FSYNC", "1") == "1"
+
+# json (за замовчуванням) — users.json + applications_by_user.json з журналом;
+# sqlite — обидва набори даних у DATA_DIR/agro_bot.sqlite3
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+
+if STORAGE_BACKEND == "sqlite":
+    SQLITE_CONN = open_sqlite_database(SQLITE_FILE)
+    USER_STORE = SqliteUserStore(SQLITE_CONN, JsonUserStore(USERS_FILE))
+    APPLICATION_STORE = SqliteApplicationStore(
+        SQLITE_CONN,
+        ApplicationStore(APPLICATIONS_FILE, APPLICATIONS_JOURNAL_FILE,
+                         APPS_COMPACT_INTERVAL, APPS_COMPACT_RECORDS, APPS_JOURNAL_FSYNC)
+    )
+else:
+    USER_STORE = JsonUserStore(USERS_FILE)
+    APPLICATION_STORE = ApplicationStore(
+        APPLICATIONS_FILE, APPLICATIONS_JOURNAL_FILE,
+        APPS_COMPACT_INTERVAL, APPS_COMPACT_RECORDS, APPS_JOURNAL_FSYNC
+    )
+
+async def run_store(func, *args, **kwargs):
+    """
+    Виклик сховища. Запити SQLite виконуються в DISK_POOL (разом з рештою дискових
+    операцій, строго по черзі). JSON-сховища працюють з пам'яттю й самі пишуть на
+    диск у фоні, тож їх викликаємо одразу.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        return await run_disk(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+async def get_user_status(user_id):
+    """'approved' / 'pending' / 'blocked' або None."""
+    return await run_store(USER_STORE.get_status, str(user_id))
+
+async def get_approved_user(user_id):
+    return await run_store(USER_STORE.get, str(user_id), "approved")
+
+async def get_users_by_status(status: str) -> dict:
+    return await run_store(USER_STORE.list, status)
+
+async def add_pending_user(user_id, info: dict):
+    await run_store(USER_STORE.set, str(user_id), "pending", info)
+
+async def update_approved_user(user_id, fields: dict) -> bool:
+    EXPORT_SHEET.mark_changed(user_id)
+    return await run_store(USER_STORE.update, str(user_id), "approved", fields)
+
+async def remove_user(user_id, status: str) -> bool:
+    if status == "approved":
+        EXPORT_SHEET.mark_changed(user_id)
+    return await run_store(USER_STORE.remove, str(user_id), status)
+
+async def get_user_applications(user_id) -> list:
+    return await run_store(APPLICATION_STORE.get_user_apps, str(user_id))
+
+async def get_application(user_id, app_index):
+    return await run_store(APPLICATION_STORE.get, str(user_id), app_index)
+
+async def find_applications_by_sheet_row(sheet_row: int) -> list:
+    """Список (uid, app_index, app) для всіх заявок з указаним sheet_row."""
+    return await run_store(APPLICATION_STORE.find_by_sheet_row, sheet_row)
+
+async def shift_legacy_application_rows(removed_rows: list):
+    """Рядки листа 1 видалено — старим заявкам (без request_number) зсуваємо sheet_row."""
+    await run_store(APPLICATION_STORE.shift_sheet_rows, removed_rows)
+
+async def find_application_by_request_number(request_number):
+    """Повертає (uid, app_index, app) для заявки з указаним номером (стовпець A) або None."""
+    return await run_store(APPLICATION_STORE.find_by_request_number, str(request_number).strip())
+
+async def list_applications_by_status(status: str) -> list:
+    """Список (uid, app_index, app) для всіх заявок з указаним proposal_status."""
+    return await run_store(APPLICATION_STORE.list_by_status, status)
+
+async def add_application(user_id, chat_id, application_data):
     application_data['timestamp'] = datetime.now().isoformat()
     application_data['user_id'] = user_id
     application_data['chat_id'] = chat_id
     application_data["proposal_status"] = "active"
-    apps = load_applications()
-    uid = str(user_id)
-    if uid not in apps:
-        apps[uid] = []
-    apps[uid].append(application_data)
-    save_applications(apps)
+    await run_store(APPLICATION_STORE.add, str(user_id), application_data)
+    EXPORT_SHEET.mark_changed(user_id)
+    recheck_manager_price(application_data)
     logging.info(f"Заявка для user_id={user_id} збережена як active.")
 
 ############################################
 # ФУНКЦІЇ ДЛЯ АДМІНА: APPROVE І BLOCK
 ############################################
 
-def approve_user(user_id):
-    data = load_users()
+async def approve_user(user_id):
     uid = str(user_id)
-    if uid not in data.get("approved_users", {}):
-        pending = data.get("pending_users", {}).get(uid, {})
+    if await get_user_status(uid) != "approved":
+        pending = await run_store(USER_STORE.get, uid, "pending") or {}
         fullname = pending.get("fullname", "")
         phone = pending.get("phone", "")
-        data.setdefault("approved_users", {})[uid] = {"fullname": fullname, "phone": phone}
-        data.get("pending_users", {}).pop(uid, None)
-        save_users(data)
+        await run_store(USER_STORE.set, uid, "approved", {"fullname": fullname, "phone": phone})
+        EXPORT_SHEET.mark_changed(uid)
         logging.info(f"Користувач {uid} схвалений.")
 
-def block_user(user_id):
-    data = load_users()
+async def block_user(user_id):
     uid = str(user_id)
-    if uid not in data.get("blocked_users", []):
-        data.setdefault("blocked_users", []).append(uid)
-        data.get("pending_users", {}).pop(uid, None)
-        data.get("approved_users", {}).pop(uid, None)
-        save_users(data)
+    if await get_user_status(uid) != "blocked":
+        await run_store(USER_STORE.set, uid, "blocked")
+        EXPORT_SHEET.mark_changed(uid)
         logging.info(f"Користувач {uid} заблокований.")
 
 ############################################
 # ОНОВЛЕННЯ СТАТУСУ ЗАЯВКИ
 ############################################
 
-def update_application_status(user_id, app_index, status, proposal=None):
-    apps = load_applications()
-    uid = str(user_id)
-    if uid in apps and 0 <= app_index < len(apps[uid]):
-        apps[uid][app_index]["proposal_status"] = status
-        if proposal is not None:
-            apps[uid][app_index]["proposal"] = proposal
-        save_applications(apps)
+async def update_application_fields(user_id, app_index, fields: dict, expected_version: int = None,
+                                    outbox: list = None) -> bool:
+    """
+    Точково змінює поля заявки (один запис у журналі).
+    expected_version — оптимістичне блокування: False, якщо заявку вже змінили.
+    outbox — сповіщення, що зберігаються разом зі зміною і доставляються OUTBOX_RELAY.
+    """
+    return await run_store(APPLICATION_STORE.update, str(user_id), app_index, fields, expected_version, outbox)
 
-def delete_application_soft(user_id, app_index):
+async def update_application_status(user_id, app_index, status, proposal=None):
+    fields = {"proposal_status": status}
+    if proposal is not None:
+        fields["proposal"] = proposal
+    await update_application_fields(user_id, app_index, fields)
+
+async def delete_application_soft(user_id, app_index):
     """
     «М'яке» видалення: тільки змінюємо status -> 'deleted', не видаляємо з файлу.
     Таким чином заявка переходить у «видалені», але ще лежить у файлі.
     """
-    apps = load_applications()
-    uid = str(user_id)
-    if uid in apps and 0 <= app_index < len(apps[uid]):
-        apps[uid][app_index]["proposal_status"] = "deleted"
-        save_applications(apps)
+    await update_application_fields(user_id, app_index, {"proposal_status": "deleted"})
 
-def delete_application_from_file_entirely(user_id, app_index):
+async def delete_application_from_file_entirely(user_id, app_index):
     """Повне видалення з файлу (із масиву apps[uid])."""
-    apps = load_applications()
-    uid = str(user_id)
-    if uid in apps and 0 <= app_index < len(apps[uid]):
-        del apps[uid][app_index]
-        if not apps[uid]:
-            apps.pop(uid, None)  # Якщо масив став порожнім
-        save_applications(apps)
+    await run_store(APPLICATION_STORE.remove, str(user_id), app_index)
+    EXPORT_SHEET.mark_changed(user_id)
+
+async def delete_applications_entirely(refs: list) -> list:
+    """Повне видалення кількох заявок [(user_id, app_index), ...] одним записом."""
+    for uid, _ in refs:
+        EXPORT_SHEET.mark_changed(uid)
+    return await run_store(APPLICATION_STORE.remove_many, [(str(uid), idx) for uid, idx in refs])
+
+async def delete_applications_by_numbers(request_numbers: list) -> list:
+    """Повне видалення заявок за номерами (ті, що вже зникли, пропускаються)."""
+    refs = []
+    for number in request_numbers:
+        found = await find_application_by_request_number(number)
+        if found:
+            refs.append((found[0], found[1]))
+    return await delete_applications_entirely(refs)
 
 ############################################
 # ФУНКЦІЇ ВИДАЛЕННЯ РЯДКА У GSheets
 ############################################
 
-def init_gspread():
+_gspread_lock = threading.Lock()
+_gspread_client = None
+_spreadsheet_cache = {}
+_worksheet_cache = {}
+
+class QuotaLimiter:
+    """
+    Маркерне відро (token bucket) під хвилинну квоту Sheets API. Потоки SHEETS_POOL
+    беруть маркер без очікування (try_acquire); якщо маркерів немає, виклик
+    повертається на event loop і чекає там (acquire_async). Серед тих, хто чекає,
+    маркер першим отримує виклик з меншим priority (адмін -> користувач -> фон),
+    а за однакового пріоритету — той, хто прийшов раніше.
+    acquire — блокуюче очікування в потоці для викликів, які вже не можна перезапустити.
+    """
+
+    def __init__(self, name: str, per_minute: int, burst: int):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int):
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    # Голова черги чекає на наступний маркер, решта — на сигнал
+                    timeout = (1 - self._tokens) / self.rate if self._waiters[0] == ticket else None
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self.acquired += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.total_wait += waited
+
+    def try_acquire(self, priority: int) -> bool:
+        """Маркер без очікування; не забирає його в того, хто чекає з не нижчим пріоритетом."""
+        with self._cond:
+            self._refill()
+            if self._tokens >= 1 and (not self._waiters or self._waiters[0][0] > priority):
+                self._tokens -= 1
+                self.acquired += 1
+                return True
+            return False
+
+    async def acquire_async(self, priority: int):
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._cond:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    delay = max(0.01, (1 - self._tokens) / self.rate)
+                await asyncio.sleep(delay)
+        finally:
+            with self._cond:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        self.acquired += 1
+        if waited > 0.001:
+            self.throttled += 1
+            self.total_wait += waited
+
+    def refund(self):
+        with self._cond:
+            self._tokens = min(self.capacity, self._tokens + 1)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill()
+            return {
+                "per_minute": round(self.rate * 60),
+                "tokens": round(self._tokens, 1),
+                "waiting": len(self._waiters),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "total_wait_s": round(self.total_wait, 1),
+            }
+
+# Квоти Sheets API на користувача (сервісний акаунт) за замовчуванням — 60 читань і 60 записів за хвилину
+SHEETS_READ_LIMITER = QuotaLimiter(
+    "read", int(os.getenv("SHEETS_READ_QUOTA_PER_MINUTE", "60")), int(os.getenv("SHEETS_READ_BURST", "10"))
+)
+SHEETS_WRITE_LIMITER = QuotaLimiter(
+    "write", int(os.getenv("SHEETS_WRITE_QUOTA_PER_MINUTE", "60")), int(os.getenv("SHEETS_WRITE_BURST", "10"))
+)
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+SHEETS_BACKOFF_BASE = float(os.getenv("SHEETS_BACKOFF_BASE_SECONDS", "1.0"))
+SHEETS_BACKOFF_MAX = 32.0
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+SHEETS_RETRY_STATS = {"retries": 0, "gave_up": 0}
+
+def sheets_backoff_delay(attempt: int, retry_after=None) -> float:
+    delay = min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** (attempt - 1))
+    # Повний джитер, щоб виклики не повторювали запит одночасно
+    delay = random.uniform(0, delay)
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+class QuotaAwareClient(gspread.Client):
+    """
+    Клієнт gspread, у якого кожен HTTP-запит проходить через QuotaLimiter
+    (GET — квота читань, решта — квота записів), а 429/5xx і мережеві збої
+    повторюються з експоненційною затримкою з джитером.
+    Поки в межах виклику run_sheets жоден запит ще не виконано, очікування маркера
+    і затримки виносяться на event loop (SheetsRetryLater); далі — чекаємо в потоці.
+    spreadsheets.batchUpdate і append неідемпотентні (видалення рядків, дописування),
+    тому їх повторюємо лише після 429 — тоді сервер запит точно не виконав.
+    """
+
+    def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+        is_read = method.lower() == "get"
+        idempotent = is_read or method.lower() == "put" or "values:batchUpdate" in endpoint
+        limiter = SHEETS_READ_LIMITER if is_read else SHEETS_WRITE_LIMITER
+        context = _sheets_call_context
+        priority = getattr(context, "priority", SHEETS_PRIORITY_USER)
+        attempt = 0
+        while True:
+            if getattr(context, "prepaid", None) is limiter:
+                context.prepaid = None
+            elif not limiter.try_acquire(priority):
+                if getattr(context, "restartable", False):
+                    raise SheetsRetryLater(limiter=limiter)
+                limiter.acquire(priority)
+            retry_after = None
+            try:
+                response = super().request(method, endpoint, params=params, data=data, json=json,
+                                           files=files, headers=headers)
+                # Перезапуск виклику повторив би вже виконані запити (і витратив би квоту ще раз)
+                context.restartable = False
+                return response
+            except APIError as e:
+                status = e.response.status_code
+                if status not in _RETRYABLE_STATUSES or (status != 429 and not idempotent):
+                    # Викликач може обробити помилку й продовжити — це теж виконаний запит
+                    context.restartable = False
+                    raise
+                retry_after = e.response.headers.get("Retry-After")
+                error = e
+            except (RequestsConnectionError, RequestsTimeout) as e:
+                if not idempotent:
+                    # Запит міг дійти до сервера — перезапуск його б повторив
+                    context.restartable = False
+                    raise
+                error = e
+            if getattr(context, "restartable", False):
+                raise SheetsRetryLater(error=error, retry_after=retry_after)
+            attempt += 1
+            if attempt > SHEETS_MAX_RETRIES:
+                SHEETS_RETRY_STATS["gave_up"] += 1
+                raise error
+            SHEETS_RETRY_STATS["retries"] += 1
+            delay = sheets_backoff_delay(attempt, retry_after)
+            logging.warning(f"Sheets API: {error}; повтор {attempt}/{SHEETS_MAX_RETRIES} через {delay:.1f} с")
+            time.sleep(delay)
+
+def get_sheets_quota_stats() -> dict:
+    return {
+        "read": SHEETS_READ_LIMITER.stats(),
+        "write": SHEETS_WRITE_LIMITER.stats(),
+        **SHEETS_RETRY_STATS,
+    }
+
+# FAKE_SHEETS=1 — робота з імітацією Sheets API у пам'яті (fake_sheets.py) замість Google:
+# для бенчмарків і перевірок без мережі та облікових даних
+FAKE_SHEETS = os.getenv("FAKE_SHEETS", "0") == "1"
+FAKE_SHEETS_LATENCY = float(os.getenv("FAKE_SHEETS_LATENCY_SECONDS", "0"))
+FAKE_SHEETS_ERROR_RATE = float(os.getenv("FAKE_SHEETS_ERROR_RATE", "0"))
+
+def _create_fake_gspread_client():
+    from fake_sheets import FakeSheetsSession
+    session = FakeSheetsSession(latency=FAKE_SHEETS_LATENCY, error_rate=FAKE_SHEETS_ERROR_RATE)
+    session.add_sheet(GOOGLE_SPREADSHEET_ID, SHEET1_NAME, cols=SHEET1_ROW_WIDTH, values=[["№"]])
+    session.add_sheet(GOOGLE_SPREADSHEET_ID2, SHEET2_NAME)
+    logging.warning("Google Sheets: використовується імітація в пам'яті (FAKE_SHEETS=1)")
+    return QuotaAwareClient(None, session=session)
+
+def _create_gspread_client():
+    if FAKE_SHEETS:
+        return _create_fake_gspread_client()
     scope = [
         "https://spreadsheets.google.com/feeds",
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive"
     ]
     creds = ServiceAccountCredentials.from_json_keyfile_dict(gspread_creds_dict, scope)
-    client = gspread.authorize(creds)
+    client = gspread.authorize(creds, client_class=QuotaAwareClient)
+    # Одна сесія з пулом з'єднань на всі потоки SHEETS_POOL (keep-alive до Google)
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=SHEETS_WORKERS)
+    client.session.mount("https://", adapter)
     return client
 
-def get_worksheet1():
+def init_gspread():
+    """
+    Спільний клієнт gspread: створюється один раз на процес і перевикористовується
+    всіма потоками. Токен сервісного акаунта оновлює сама AuthorizedSession
+    (перед запитом, якщо строк дії минув, і повторно після 401).
+    """
+    global _gspread_client
+    with _gspread_lock:
+        if _gspread_client is None:
+            _gspread_client = _create_gspread_client()
+        return _gspread_client
+
+def get_spreadsheet(spreadsheet_id: str):
     client = init_gspread()
-    sheet = client.open_by_key(GOOGLE_SPREADSHEET_ID)
-    ws = sheet.worksheet(SHEET1_NAME)
+    with _gspread_lock:
+        sheet = _spreadsheet_cache.get(spreadsheet_id)
+    if sheet is None:
+        sheet = client.open_by_key(spreadsheet_id)
+        with _gspread_lock:
+            _spreadsheet_cache[spreadsheet_id] = sheet
+    return sheet
+
+def get_cached_worksheet(spreadsheet_id: str, sheet_name: str):
+    """Повертає збережений дескриптор листа; таблиця відкривається лише при першому зверненні."""
+    key = (spreadsheet_id, sheet_name)
+    with _gspread_lock:
+        ws = _worksheet_cache.get(key)
+    if ws is None:
+        ws = get_spreadsheet(spreadsheet_id).worksheet(sheet_name)
+        with _gspread_lock:
+            _worksheet_cache[key] = ws
     return ws
 
+def invalidate_gspread_cache():
+    """Після помилки API листи відкриваються заново (могли змінитися назви, розміри тощо)."""
+    with _gspread_lock:
+        _spreadsheet_cache.clear()
+        _worksheet_cache.clear()
+
+def get_worksheet1():
+    return get_cached_worksheet(GOOGLE_SPREADSHEET_ID, SHEET1_NAME)
+
 def get_worksheet2():
-    client = init_gspread()
-    sheet = client.open_by_key(GOOGLE_SPREADSHEET_ID2)
-    ws = sheet.worksheet(SHEET2_NAME)
+    return get_cached_worksheet(GOOGLE_SPREADSHEET_ID2, SHEET2_NAME)
+
+############################################
+# ЧЕРГА ЗАПИСІВ У GOOGLE SHEETS (ОБ'ЄДНАННЯ ЗАПИТІВ)
+############################################
+
+class SheetsWriteQueue:
+    """
+    Асинхронна черга змін однієї таблиці. Записи значень і форматування, що надійшли
+    протягом window секунд, надсилаються разом: один values.batchUpdate і один
+    spreadsheets.batchUpdate. Повторний запис у той самий діапазон замінює попередній
+    (останній виграє). Кожен виклик повертає future: його можна чекати, якщо потрібне
+    підтвердження, або ігнорувати — помилки тоді лише логуються.
+    Перед структурними змінами (видалення рядків) чергу треба скинути через flush().
+    """
+
+    def __init__(self, spreadsheet_id: str, window: float):
+        self.spreadsheet_id = spreadsheet_id
+        self.window = window
+        # (лист, діапазон) -> [значення, [future, ...]]
+        self._values = {}
+        # (лист, діапазон, поля) -> [CellFormat, [future, ...]]
+        self._formats = {}
+        self._flush_handle = None
+        self._flush_lock = None
+        self.flushes = 0
+        self.queued = 0
+        self.sent_requests = 0
+
+    def write_values(self, sheet_name: str, a1_range: str, values: list) -> asyncio.Future:
+        return self._enqueue(self._values, (sheet_name, a1_range), values)
+
+    def format_range(self, sheet_name: str, a1_range: str, cell_format) -> asyncio.Future:
+        key = (sheet_name, a1_range, ",".join(cell_format.affected_fields("userEnteredFormat")))
+        return self._enqueue(self._formats, key, cell_format)
+
+    def _enqueue(self, pending: dict, key, payload) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(_log_failed_sheet_write)
+        entry = pending.setdefault(key, [None, []])
+        entry[0] = payload
+        entry[1].append(future)
+        self.queued += 1
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, lambda: asyncio.ensure_future(self.flush()))
+        return future
+
+    async def flush(self):
+        """Надіслати все, що накопичилось (і дочекатися попереднього відправлення)."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            values, self._values = self._values, {}
+            formats, self._formats = self._formats, {}
+            if not values and not formats:
+                return
+            futures = [f for _, fs in list(values.values()) + list(formats.values()) for f in fs]
+            try:
+                await run_sheets(
+                    self._send,
+                    [(key, payload) for key, (payload, _) in values.items()],
+                    [(key, payload) for key, (payload, _) in formats.items()],
+                )
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
+            self.flushes += 1
+
+    def _send(self, values: list, formats: list):
+        spreadsheet = get_spreadsheet(self.spreadsheet_id)
+        if values:
+            spreadsheet.values_batch_update(body={
+                "valueInputOption": "USER_ENTERED",
+                "data": [
+                    {"range": f"'{sheet_name}'!{a1_range}", "values": payload}
+                    for (sheet_name, a1_range), payload in values
+                ],
+            })
+            self.sent_requests += 1
+        if formats:
+            requests_body = []
+            for (sheet_name, a1_range, fields), cell_format in formats:
+                ws = get_cached_worksheet(self.spreadsheet_id, sheet_name)
+                requests_body.append({
+                    "repeatCell": {
+                        "range": a1_range_to_grid_range(a1_range, ws.id),
+                        "cell": {"userEnteredFormat": cell_format.to_props()},
+                        "fields": fields,
+                    }
+                })
+            spreadsheet.batch_update({"requests": requests_body})
+            self.sent_requests += 1
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(len(fs) for _, fs in list(self._values.values()) + list(self._formats.values())),
+            "queued": self.queued,
+            "flushes": self.flushes,
+            "requests": self.sent_requests,
+        }
+
+def _log_failed_sheet_write(future):
+    if not future.cancelled() and future.exception() is not None:
+        logging.error(f"Помилка відкладеного запису в Google Sheets: {future.exception()}")
+
+SHEETS_WRITE_WINDOW = float(os.getenv("SHEETS_WRITE_WINDOW_SECONDS", "0.5"))
+_write_queues = {}
+
+def get_write_queue(spreadsheet_id: str) -> SheetsWriteQueue:
+    """Одна черга на таблицю (навіть якщо обидва ID вказують на ту саму)."""
+    queue = _write_queues.get(spreadsheet_id)
+    if queue is None:
+        queue = _write_queues[spreadsheet_id] = SheetsWriteQueue(spreadsheet_id, SHEETS_WRITE_WINDOW)
+    return queue
+
+async def flush_sheet_writes():
+    for queue in list(_write_queues.values()):
+        await queue.flush()
+
+def set_grid_size(ws, rows: int = None, cols: int = None):
+    """gspread не оновлює закешовані розміри листа після resize/batch_update — робимо це самі."""
+    grid = ws._properties.setdefault("gridProperties", {})
+    if rows is not None:
+        grid["rowCount"] = rows
+    if cols is not None:
+        grid["columnCount"] = cols
+
+def refresh_grid_size(ws):
+    """Перечитує фактичні розміри листа (закешований дескриптор міг застаріти після видалень)."""
+    metadata = ws.spreadsheet.fetch_sheet_metadata({"fields": "sheets.properties"})
+    for sheet in metadata.get("sheets", []):
+        properties = sheet["properties"]
+        if properties["sheetId"] == ws.id:
+            grid = properties.get("gridProperties", {})
+            set_grid_size(ws, grid.get("rowCount"), grid.get("columnCount"))
+            break
     return ws
 
 def ensure_columns(ws, required_col: int):
+    # Змінюється лише кількість стовпців: закешований row_count міг застаріти
     if ws.col_count < required_col:
-        ws.resize(rows=ws.row_count, cols=required_col)
+        ws.resize(cols=required_col)
+        set_grid_size(ws, cols=required_col)
 
 def delete_price_cell_in_table2(row: int, col: int = 12):
     """
@@ -363,261 +2270,1145 @@ def delete_price_cell_in_table2(row: int, col: int = 12):
     зі зсувом усіх наступних рядків вгору, а також
     прибрати колір (щоб не переносився на інші рядки).
     """
-    ws2 = get_worksheet2()
-
-    # Спочатку очищаємо форматування (колір) у стовпці починаючи з цього рядка:
-    format_cell_range(
-        ws2,
-        f"{rowcol_to_a1(row, col)}:{rowcol_to_a1(ws2.row_count, col)}",
-        cellFormat(backgroundColor=Color(1, 1, 1))
-    )
+    delete_price_cells_in_table2([row], col)
 
-    col_values = ws2.col_values(col)
-    if row - 1 >= len(col_values):
+def delete_price_cells_in_table2(rows: list, col: int = 12):
+    """
+    Те саме для кількох рядків одним batchUpdate: білий фон у стовпці від найменшого
+    рядка до кінця листа, далі серверне видалення клітинок знизу вгору
+    (щоб видалення нижньої не зсувало номери верхніх).
+    Рядки нижче даних порожні, тож зсув там нічого не змінює.
+    Розмір листа перечитується: рядки за межами сітки API відхилить разом з усім batchUpdate.
+    """
+    ws2 = refresh_grid_size(get_worksheet2())
+    rows = sorted({row for row in rows if row <= ws2.row_count}, reverse=True)
+    if not rows:
         return
 
-    # Видаляємо значення (зсув вгору)
-    col_values.pop(row - 1)
-    for i in range(row - 1, len(col_values)):
-        ws2.update_cell(i + 1, col, col_values[i])
+    def column_range(start_row: int, end_row: int = None) -> dict:
+        grid_range = {
+            "sheetId": ws2.id,
+            "startRowIndex": start_row - 1,
+            "startColumnIndex": col - 1,
+            "endColumnIndex": col,
+        }
+        # Без endRowIndex діапазон іде до кінця листа
+        if end_row is not None:
+            grid_range["endRowIndex"] = end_row
+        return grid_range
+
+    requests_body = [{
+        "repeatCell": {
+            "range": column_range(rows[-1]),
+            "cell": {"userEnteredFormat": {"backgroundColor": {"red": 1, "green": 1, "blue": 1}}},
+            "fields": "userEnteredFormat.backgroundColor",
+        }
+    }]
+    requests_body += [
+        {"deleteRange": {"range": column_range(row, row), "shiftDimension": "ROWS"}}
+        for row in rows
+    ]
+    ws2.spreadsheet.batch_update({"requests": requests_body})
+
+EXPORT_HEADERS = ["ID", "ПІБ", "Номер телефону", "Остання заявка", "Загальна кількість заявок"]
 
-    # Очищаємо останню клітинку після зсуву
-    last_row_to_clear = len(col_values) + 1
-    ws2.update_cell(last_row_to_clear, col, "")
-    
-from gspread_formatting import (
-    format_cell_range,
-    CellFormat,
-    TextFormat,
-    set_column_width
+# Відцентровування і жирний шрифт для всіх клітинок вивантаження
+EXPORT_CELL_FORMAT = CellFormat(
+    horizontalAlignment='CENTER',
+    verticalAlignment='MIDDLE',
+    textFormat=TextFormat(bold=True)
 )
 
-def export_database():
+def export_row(uid, info: dict, count_apps: int, last_ts: str) -> list:
+    """Рядок вивантаження: ID, ПІБ, телефон, остання заявка (дд.мм.рррр, alt+enter, гг:хв), кількість заявок."""
+    last_timestamp = ""
+    if count_apps > 0:
+        try:
+            dt = datetime.fromisoformat(last_ts)
+            last_timestamp = dt.strftime("%d.%m.%Y\n%H:%M")
+        except Exception:
+            last_timestamp = last_ts
+    return [uid, info.get("fullname", ""), info.get("phone", ""), last_timestamp, count_apps]
+
+async def build_export_matrix() -> list:
+    """
+    Формує матрицю для вивантаження бази з локального сховища
+    (запити SQLite — у DISK_POOL через run_store).
+    Перший рядок — заголовки, решта — дані користувачів.
+    """
+    approved = await get_users_by_status("approved")
+    data_matrix = [list(EXPORT_HEADERS)]
+    # Кількість і час останньої заявки — для всіх користувачів одразу, а не перебором заявок кожного
+    app_stats = await run_store(APPLICATION_STORE.user_app_stats)
+
+    for uid, info in approved.items():
+        count_apps, ts = app_stats.get(str(uid), (0, ""))
+        data_matrix.append(export_row(uid, info, count_apps, ts))
+    return data_matrix
+
+# Скільки рядків вивантаження надсилати одним values.update
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+
+def _export_format_request(sheet_id: int, first_row: int, last_row: int) -> dict:
+    return {
+        "repeatCell": {
+            "range": a1_range_to_grid_range(f"A{first_row}:E{last_row}", sheet_id),
+            "cell": {"userEnteredFormat": EXPORT_CELL_FORMAT.to_props()},
+            "fields": ",".join(EXPORT_CELL_FORMAT.affected_fields("userEnteredFormat")),
+        }
+    }
+
+def _export_width_requests(sheet_id: int, max_len: dict) -> list:
+    """Ширина стовпців {індекс_стовпця: найдовший текст}: приблизно 10 пікселів на символ."""
+    return [
+        {
+            "updateDimensionProperties": {
+                "range": {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": col, "endIndex": col + 1},
+                "properties": {"pixelSize": length * 10},
+                "fields": "pixelSize",
+            }
+        }
+        for col, length in sorted(max_len.items())
+    ]
+
+def export_database(data_matrix: list):
     """
     Створює новий лист у таблиці 1 з назвою "База дд.мм"
-    і вносить дані для кожного схваленого користувача:
+    і вносить дані (з build_export_matrix) для кожного схваленого користувача:
       A: Телеграм‑ID
       B: ПІБ
       C: Номер телефону
       D: Остання заявка (дата у форматі дд.мм.рррр, alt+enter, час у форматі гг:хв)
       E: Загальна кількість заявок
-    Використовуємо один виклик update() для завантаження всієї матриці даних,
-    а потім застосовуємо форматування:
+    Лист створюється рівно під розмір даних, матриця записується частинами
+    по EXPORT_CHUNK_ROWS рядків, а форматування разом із шириною стовпців
+    іде одним batchUpdate:
       - Вирівнювання по центру (горизонтально та вертикально)
       - Жирний шрифт для всього тексту
-      - Автоматичне встановлення ширини стовпців на основі максимального вмісту
+      - Ширина стовпців за максимальною довжиною вмісту
     """
-    # Завантаження даних
-    users_data = load_users()
-    approved = users_data.get("approved_users", {})
-    apps = load_applications()
-
     # Отримуємо доступ до таблиці 1
-    client = init_gspread()
-    sheet = client.open_by_key(GOOGLE_SPREADSHEET_ID)
+    sheet = get_spreadsheet(GOOGLE_SPREADSHEET_ID)
 
     # Форматуємо назву листа за поточною датою (наприклад, "База 13.02")
     today = datetime.now().strftime("%d.%m")
     new_title = f"База {today}"
-    new_ws = sheet.add_worksheet(title=new_title, rows="1000", cols="5")
-
-    # Формуємо матрицю даних: перший рядок — заголовки, решта — дані користувачів
-    headers = ["ID", "ПІБ", "Номер телефону", "Остання заявка", "Загальна кількість заявок"]
-    data_matrix = [headers]
+    num_cols = len(EXPORT_HEADERS)
+    end_row = len(data_matrix)
+    new_ws = sheet.add_worksheet(title=new_title, rows=max(end_row, 1), cols=num_cols)
+
+    # Записуємо частинами і заодно рахуємо найдовший текст у кожному стовпці
+    max_len = dict.fromkeys(range(num_cols), 0)
+    for start in range(0, end_row, EXPORT_CHUNK_ROWS):
+        chunk = data_matrix[start:start + EXPORT_CHUNK_ROWS]
+        for row in chunk:
+            for col in range(num_cols):
+                max_len[col] = max(max_len[col], len(str(row[col])))
+        chunk_range = f"A{start + 1}:E{start + len(chunk)}"
+        new_ws.update(chunk_range, chunk, value_input_option="USER_ENTERED")
+
+    requests_body = [_export_format_request(new_ws.id, 1, max(end_row, 1))]
+    requests_body += _export_width_requests(new_ws.id, max_len)
+    sheet.batch_update({"requests": requests_body})
+
+# incremental — один лист EXPORT_SHEET_NAME, у якому переписуються лише рядки змінених користувачів;
+# daily — як раніше, новий лист "База дд.мм" на кожне вивантаження
+EXPORT_MODE = os.getenv("EXPORT_MODE", "incremental").lower()
+EXPORT_SHEET_NAME = os.getenv("EXPORT_SHEET_NAME", "База")
+
+class IncrementalExport:
+    """
+    Постійний лист вивантаження бази. Хендлери, що змінюють користувача або
+    кількість / дати його заявок, позначають його через mark_changed(); під час
+    вивантаження переписуються лише рядки позначених користувачів (за картою
+    uid -> рядок), нові дописуються в кінець, ті, хто більше не схвалений, видаляються.
+    Уся структура (видалення рядків, розмір листа, формат нових рядків, ширина
+    стовпців) — один spreadsheets.batchUpdate, значення — один values.batchUpdate
+    на EXPORT_CHUNK_ROWS рядків.
+    Після рестарту (або помилки) карта рядків перечитується зі стовпця A,
+    а перше вивантаження переписує всіх користувачів.
+    """
 
-    for uid, info in approved.items():
-        user_apps = apps.get(uid, [])
-        count_apps = len(user_apps)
-        last_timestamp = ""
-        if count_apps > 0:
-            last_app = max(user_apps, key=lambda a: a.get("timestamp", ""))
-            ts = last_app.get("timestamp", "")
+    def __init__(self, spreadsheet_id: str, sheet_name: str):
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.changed = set()
+        self.full = True
+        # uid -> рядок листа; None — ще не прочитано з таблиці
+        self.rows = None
+        self.row_count = 0
+        self.max_len = {}
+        self._lock = None
+        self.exports = 0
+        self.rows_written = 0
+        self.rows_removed = 0
+
+    def mark_changed(self, user_id):
+        self.changed.add(str(user_id))
+
+    @staticmethod
+    async def _user_row(uid: str):
+        info = await get_approved_user(uid)
+        if info is None:
+            return None
+        user_apps = await get_user_applications(uid)
+        last_ts = max((app.get("timestamp", "") for app in user_apps), default="")
+        return export_row(uid, info, len(user_apps), last_ts)
+
+    async def export(self) -> int:
+        """Вивантажує зміни з минулого разу. Повертає кількість записаних і видалених рядків."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            full, changed = self.full, self.changed
+            self.full, self.changed = False, set()
+            if full:
+                changes = {str(row[0]): row for row in (await build_export_matrix())[1:]}
+            else:
+                changes = {uid: await self._user_row(uid) for uid in changed}
             try:
-                dt = datetime.fromisoformat(ts)
-                last_timestamp = dt.strftime("%d.%m.%Y\n%H:%M")
+                count = await run_sheets(self._apply, changes, full, priority=SHEETS_PRIORITY_ADMIN)
             except Exception:
-                last_timestamp = ts
-        row = [uid, info.get("fullname", ""), info.get("phone", ""), last_timestamp, count_apps]
-        data_matrix.append(row)
-
-    # Batch update всіх клітинок матриці даних
-    end_row = len(data_matrix)
-    cell_range = f"A1:E{end_row}"
-    new_ws.update(cell_range, data_matrix, value_input_option="USER_ENTERED")
-
-    # Створюємо форматування: відцентровування і жирний шрифт
-    cell_format = CellFormat(
-        horizontalAlignment='CENTER',
-        verticalAlignment='MIDDLE',
-        textFormat=TextFormat(bold=True)
-    )
-    # Форматуємо весь діапазон
-    format_cell_range(new_ws, cell_range, cell_format)
-
-    # Автоматичне встановлення ширини стовпців
-    # Обчислюємо максимальну довжину тексту для кожного стовпця
-    num_cols = 5
-    for col in range(1, num_cols + 1):
-        # Отримуємо літерне позначення стовпця, напр. "A" для 1, "B" для 2 і т.д.
-        col_letter = rowcol_to_a1(1, col)[0]
-        col_range = f"{col_letter}:{col_letter}"
-        max_len = max(len(str(row[col-1])) for row in data_matrix)
-        width = max_len * 10  # Приблизне число пікселів на символ (можна налаштувати)
-        set_column_width(new_ws, col_range, width)
+                # Невідомо, що саме встигло записатися — наступного разу все з нуля
+                self.full = True
+                self.changed |= changed
+                self.rows = None
+                raise
+            self.exports += 1
+            return count
+
+    def _worksheet(self):
+        """Лист вивантаження; якщо його ще немає — створюється із заголовком (повертає ws, створено)."""
+        try:
+            return get_cached_worksheet(self.spreadsheet_id, self.sheet_name), False
+        except gspread.WorksheetNotFound:
+            ws = get_spreadsheet(self.spreadsheet_id).add_worksheet(
+                title=self.sheet_name, rows=1, cols=len(EXPORT_HEADERS)
+            )
+            with _gspread_lock:
+                _worksheet_cache[(self.spreadsheet_id, self.sheet_name)] = ws
+            return ws, True
+
+    def _apply(self, changes: dict, full: bool) -> int:
+        """Виконується в SHEETS_POOL. changes — {uid: рядок_даних або None (прибрати)}."""
+        ws, created = self._worksheet()
+        if created:
+            self.rows = {}
+            self.max_len = {}
+            self.row_count = ws.row_count
+        elif self.rows is None:
+            column = ws.col_values(1)
+            self.rows = {value.strip(): i for i, value in enumerate(column[1:], start=2) if value.strip()}
+            self.max_len = {}
+            self.row_count = ws.row_count
+        if full:
+            # Повне вивантаження: хто є в листі, але вже не схвалений — видаляється
+            for uid in self.rows:
+                changes.setdefault(uid, None)
+
+        # Нова карта рядків рахується в копії і приймається лише після зміни структури листа:
+        # якщо run_sheets перезапустить виклик (SheetsRetryLater), він почне з того самого стану
+        rows = dict(self.rows)
+        max_len = dict(self.max_len)
+        removed = sorted(rows.pop(uid) for uid, row in changes.items() if row is None and uid in rows)
+        if removed:
+            rows = {uid: r - bisect.bisect_left(removed, r) for uid, r in rows.items()}
+        next_row = max(rows.values(), default=1) + 1
+        first_new_row = next_row
+        for uid, row in changes.items():
+            if row is not None and uid not in rows:
+                rows[uid] = next_row
+                next_row += 1
+        last_row = next_row - 1
+
+        writes = sorted((rows[uid], row) for uid, row in changes.items() if row is not None)
+        if created:
+            writes.insert(0, (1, list(EXPORT_HEADERS)))
+        grown = {}
+        for _, row in writes:
+            for col, value in enumerate(row):
+                length = len(str(value))
+                if length > max_len.get(col, 0):
+                    max_len[col] = grown[col] = length
+
+        requests_body = [
+            {"deleteDimension": {"range": {
+                "sheetId": ws.id, "dimension": "ROWS", "startIndex": row - 1, "endIndex": row
+            }}}
+            for row in reversed(removed)
+        ]
+        if last_row != self.row_count - len(removed):
+            requests_body.append({"updateSheetProperties": {
+                "properties": {"sheetId": ws.id, "gridProperties": {"rowCount": last_row}},
+                "fields": "gridProperties.rowCount",
+            }})
+        if created or last_row >= first_new_row:
+            requests_body.append(_export_format_request(ws.id, 1 if created else first_new_row, last_row))
+        requests_body += _export_width_requests(ws.id, grown)
+        if requests_body:
+            ws.spreadsheet.batch_update({"requests": requests_body})
+        self.rows, self.max_len = rows, max_len
+        self.row_count = last_row
+        set_grid_size(ws, rows=last_row)
+
+        # Сусідні рядки об'єднуються в один діапазон
+        for start in range(0, len(writes), EXPORT_CHUNK_ROWS):
+            data = []
+            for row_number, row in writes[start:start + EXPORT_CHUNK_ROWS]:
+                if data and data[-1][1] == row_number - 1:
+                    data[-1][1] = row_number
+                    data[-1][2].append(row)
+                else:
+                    data.append([row_number, row_number, [row]])
+            ws.spreadsheet.values_batch_update(body={
+                "valueInputOption": "USER_ENTERED",
+                "data": [
+                    {"range": f"'{self.sheet_name}'!A{first}:E{last}", "values": values}
+                    for first, last, values in data
+                ],
+            })
+
+        self.rows_written += len(writes)
+        self.rows_removed += len(removed)
+        return len(writes) + len(removed)
+
+    def stats(self) -> dict:
+        return {
+            "mode": EXPORT_MODE,
+            "pending_users": len(self.changed),
+            "full_pending": self.full,
+            "exports": self.exports,
+            "rows_written": self.rows_written,
+            "rows_removed": self.rows_removed,
+        }
+
+EXPORT_SHEET = IncrementalExport(GOOGLE_SPREADSHEET_ID, EXPORT_SHEET_NAME)
 
 @dp.message_handler(Text(equals="Вивантажити базу"), state=AdminReview.viewing_approved_list)
 async def handle_export_database(message: types.Message, state: FSMContext):
     """
     Хендлер для кнопки "Вивантажити базу" у розділі "База користувачів".
-    При натисканні викликається функція export_database(), а адміністратору повідомляється про результат.
+    У режимі incremental оновлює постійний лист EXPORT_SHEET_NAME (лише змінені рядки),
+    у режимі daily викликає export_database(); адміністратору повідомляється про результат.
     """
     try:
-        export_database()
+        if EXPORT_MODE == "daily":
+            await run_sheets(export_database, await build_export_matrix(), priority=SHEETS_PRIORITY_ADMIN)
+        else:
+            await EXPORT_SHEET.export()
         await message.answer("База успішно вивантажена до Google Sheets.", reply_markup=get_admin_moderation_menu())
     except Exception as e:
         logging.exception(f"Помилка вивантаження бази: {e}")
         await message.answer("Помилка вивантаження бази.", reply_markup=get_admin_moderation_menu())
 
+# xlsx (потрібен openpyxl) або csv
+EXPORT_FILE_FORMAT = os.getenv("EXPORT_FILE_FORMAT", "xlsx").lower()
+
+# Поля заявки у файлі вивантаження: (ключ, заголовок)
+EXPORT_APP_FIELDS = [
+    ("request_number", "№ заявки"),
+    ("timestamp", "Дата створення"),
+    ("proposal_status", "Статус"),
+    ("fgh_name", "ФГ"),
+    ("edrpou", "ЄДРПОУ"),
+    ("region", "Область"),
+    ("district", "Район"),
+    ("city", "Місто"),
+    ("group", "Група"),
+    ("culture", "Культура"),
+    ("quantity", "Кількість, т"),
+    ("payment_form", "Форма оплати"),
+    ("currency", "Валюта"),
+    ("price", "Бажана ціна"),
+    ("manager_price", "Ціна менеджера"),
+    ("proposal", "Пропозиція ціни"),
+    ("phone", "Телефон у заявці"),
+]
+# Додаткові параметри: один стовпець на кожну назву з friendly_names
+# (різні ключі з однаковою назвою, напр. вологість для різних культур, — в одному стовпці)
+EXPORT_EXTRA_HEADERS = list(dict.fromkeys(friendly_names.values()))
+EXPORT_OTHER_EXTRA_HEADER = "Інші параметри"
+
+def export_file_headers() -> list:
+    return (
+        ["ID", "ПІБ", "Номер телефону"]
+        + [title for _, title in EXPORT_APP_FIELDS]
+        + EXPORT_EXTRA_HEADERS
+        + [EXPORT_OTHER_EXTRA_HEADER]
+    )
+
+def export_file_row(uid: str, info: dict, app: dict = None) -> list:
+    """Один рядок файлу: дані користувача і (якщо є) одна його заявка з розгорнутими extra_fields."""
+    row = [uid, info.get("fullname", ""), info.get("phone", "")]
+    if app is None:
+        return row + [""] * (len(EXPORT_APP_FIELDS) + len(EXPORT_EXTRA_HEADERS) + 1)
+    for key, _ in EXPORT_APP_FIELDS:
+        value = app.get(key, "")
+        if key == "timestamp" and value:
+            try:
+                value = datetime.fromisoformat(value).strftime("%d.%m.%Y %H:%M")
+            except ValueError:
+                pass
+        row.append("" if value is None else value)
+    extra = dict.fromkeys(EXPORT_EXTRA_HEADERS, "")
+    other = []
+    for key, value in (app.get("extra_fields") or {}).items():
+        title = friendly_names.get(key)
+        if title is None:
+            other.append(f"{key.capitalize()}: {value}")
+        else:
+            extra[title] = value
+    return row + list(extra.values()) + ["\n".join(other)]
+
+def write_export_file(approved: dict, apps, file_format: str) -> tuple:
+    """
+    Виконується в EXPORT_POOL. Пише схвалених користувачів і їхні заявки (apps — ітератор
+    (uid, заявка) з iter_snapshot) у тимчасовий файл рядок за рядком, тож пам'ять не залежить
+    від кількості заявок. Повертає (шлях, назва_файлу).
+    """
+    if file_format == "xlsx" and Workbook is None:
+        logging.warning("openpyxl не встановлено — вивантаження у CSV")
+        file_format = "csv"
+    filename = f"baza_{datetime.now().strftime('%d.%m.%Y')}.{file_format}"
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}", dir=DATA_DIR)
+    os.close(fd)
+
+    def rows():
+        yield export_file_headers()
+        seen = set()
+        for uid, app in apps:
+            info = approved.get(uid)
+            if info is None:
+                continue
+            seen.add(uid)
+            yield export_file_row(uid, info, app)
+        # Схвалені користувачі без жодної заявки — окремим рядком
+        for uid, info in approved.items():
+            if uid not in seen:
+                yield export_file_row(uid, info)
+
+    try:
+        if file_format == "xlsx":
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("База")
+            for row in rows():
+                # Порожні клітинки openpyxl пропускає лише як None — так файл пишеться в рази швидше
+                sheet.append([None if value == "" else value for value in row])
+            workbook.save(path)
+        else:
+            # utf-8-sig — щоб Excel правильно відкрив кирилицю
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f)
+                for row in rows():
+                    writer.writerow(row)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, filename
+
+@dp.message_handler(Text(equals="Вивантажити файлом"), state=AdminReview.viewing_approved_list)
+async def handle_export_file(message: types.Message, state: FSMContext):
+    """
+    Вивантаження бази файлом (XLSX або CSV) без Google Sheets: файл формується
+    в окремому потоці й надсилається адміністратору як документ.
+    """
+    await message.answer("Формуємо файл...")
+    path = None
+    try:
+        approved = await get_users_by_status("approved")
+        path, filename = await EXPORT_POOL.run(
+            write_export_file, approved, APPLICATION_STORE.iter_snapshot(), EXPORT_FILE_FORMAT
+        )
+        await message.answer_document(
+            types.InputFile(path, filename=filename),
+            caption="Вивантаження бази користувачів і заявок.",
+            reply_markup=get_admin_moderation_menu()
+        )
+    except Exception as e:
+        logging.exception(f"Помилка вивантаження бази файлом: {e}")
+        await message.answer("Помилка вивантаження бази файлом.", reply_markup=get_admin_moderation_menu())
+    finally:
+        if path is not None:
+            os.remove(path)
+
 ############################################
 # ПОВНЕ ВИДАЛЕННЯ ЗАЯВКИ АДМІНОМ (5 КРОКІВ)
 ############################################
 
 async def admin_remove_app_permanently(user_id: int, app_index: int):
     """
-    1) Зупинити poll_manager_proposals (pause_polling)
-    2) Видалити заявку з applications_by_user.json (остаточно)
+    1) Видалити заявку з applications_by_user.json (остаточно)
+    2) Видалити клітинку з таблиці2 (зі зсувом тексту й очищенням кольору)
     3) Видалити рядок у sheets1
-    4) Видалити клітинку з таблиці2 (зі зсувом тексту й очищенням кольору)
-    5) Затримка 20 секунд, і відновити poll_manager_proposals (resume_polling)
+    Поки рядок видаляється, поллер пропускає лише рядки, починаючи з нього (SHEET1_LAYOUT).
+    Інші заявки прив'язані до рядків через номер заявки; sheet_row зсувається лише
+    старим заявкам без номера.
     """
-    pause_polling()
-    try:
-        apps = load_applications()
-        uid = str(user_id)
-        if uid not in apps or app_index < 0 or app_index >= len(apps[uid]):
-            return False
+    app = await get_application(user_id, app_index)
+    if app is None:
+        return False
 
-        app = apps[uid][app_index]
-        sheet_row = app.get("sheet_row")
+    sheet_row = await resolve_sheet_row(app)
 
-        # 2) Видаляємо з файлу
-        delete_application_from_file_entirely(user_id, app_index)
+    # 1) Видаляємо з файлу
+    await delete_application_from_file_entirely(user_id, app_index)
 
-        # 3) Видаляємо рядок у таблиці1
-        if sheet_row:
-            try:
-                # 4) Видаляємо клітинку в таблиці2 (колонка із ціною, за замовчуванням col=12)
-                delete_price_cell_in_table2(sheet_row, 12)
-
-                ws = get_worksheet1()
-                ws.delete_rows(sheet_row)
-
-                # Оновлюємо sheet_row у залишилихся заявках (все, що було нижче - змістилося вгору на 1)
-                updated_apps = load_applications()
-                for u_str, user_apps in updated_apps.items():
-                    for a in user_apps:
-                        old_row = a.get("sheet_row", 0)
-                        if old_row and old_row > sheet_row:
-                            a["sheet_row"] = old_row - 1
-                save_applications(updated_apps)
-            except Exception as e:
-                logging.exception(f"Помилка видалення рядка в Google Sheets: {e}")
+    if sheet_row:
+        SHEET1_LAYOUT.begin_delete(sheet_row)
+        try:
+            # Відкладені зафарбовування мають потрапити у рядки до їх зсуву
+            await flush_sheet_writes()
+            # 2) Видаляємо клітинку в таблиці2 (колонка із ціною, за замовчуванням col=12)
+            await run_sheets(delete_price_cell_in_table2, sheet_row, 12, priority=SHEETS_PRIORITY_ADMIN)
+            TABLE2_COLOURS.rows_deleted([sheet_row])
+
+            # 3) Видаляємо рядок у таблиці1
+            await run_sheets(delete_sheet1_row, sheet_row, priority=SHEETS_PRIORITY_ADMIN)
+            SHEET1_SNAPSHOT.invalidate()
+            SHEET1_ROW_KEYS.remove_row(sheet_row)
+            await REQUEST_NUMBERS.rows_deleted([sheet_row])
+            await shift_legacy_application_rows([sheet_row])
+        except Exception as e:
+            logging.exception(f"Помилка видалення рядка в Google Sheets: {e}")
+        finally:
+            SHEET1_LAYOUT.end_delete(sheet_row)
 
-        return True
+    return True
+
+async def admin_remove_apps_bulk(request_numbers: list) -> int:
+    """
+    Масове видалення за номерами заявок: один batchUpdate для листа 1 (рядки
+    видаляються знизу вгору), одна зміна сховища і один batchUpdate для таблиці2.
+    Сховище змінюється лише після успішного видалення рядків листа 1: якщо Sheets
+    відмовить, заявки лишаються на місці і команду можна повторити.
+    Повертає кількість видалених рядків листа 1.
+    """
+    # Свіжа розкладка стовпця A — номери рядків мають бути точними саме зараз
+    rows, _ = await SHEET1_SNAPSHOT.get(SHEETS_PRIORITY_ADMIN, max_age=0)
+    SHEET1_ROW_KEYS.rebuild(sheet1_row_keys(rows))
+    rows = sorted({row for row in (SHEET1_ROW_KEYS.get(n) for n in request_numbers) if row})
+    if not rows:
+        await delete_applications_by_numbers(request_numbers)
+        return 0
+
+    top_row = rows[0]
+    SHEET1_LAYOUT.begin_delete(top_row)
+    try:
+        await flush_sheet_writes()
+        # Спершу лист 1: після цього номерів у стовпці A вже немає, тож повтор
+        # команди не зсуне таблицю2 вдруге
+        await run_sheets(delete_sheet1_rows, rows, priority=SHEETS_PRIORITY_ADMIN)
+        SHEET1_SNAPSHOT.invalidate()
+        SHEET1_ROW_KEYS.remove_rows(rows)
+        await REQUEST_NUMBERS.rows_deleted(rows)
+        # Посилання шукаються вже після await — індекси могли змінитися
+        await delete_applications_by_numbers(request_numbers)
+        await shift_legacy_application_rows(rows)
+        await run_sheets(delete_price_cells_in_table2, rows, 12, priority=SHEETS_PRIORITY_ADMIN)
+        TABLE2_COLOURS.rows_deleted(rows)
     finally:
-        # Додаємо затримку 20 секунд, щоб встигли оновитися дані в таблиці
-        await asyncio.sleep(20)
-        resume_polling()
+        SHEET1_LAYOUT.end_delete(top_row)
+    return len(rows)
 
 ############################################
 # ЗАПИС У ТАБЛИЦЮ 1
 ############################################
 
-def update_google_sheet(data: dict) -> int:
+# Рядок заявки займає стовпці A..AZ; в останньому (AZ) — user_id
+SHEET1_ROW_WIDTH = 52
+SHEET1_USER_ID_COL = 52
+SHEET1_REQUEST_NO_COL = 1
+SHEET1_MANAGER_PRICE_COL = 14
+
+def get_sheet1_poll_columns() -> dict:
+    """
+    Лише стовпці, потрібні поллеру (номер заявки, ціна менеджера, user_id), одним batch_get.
+    Повертає {номер_рядка: (номер_заявки, ціна_менеджера, user_id)} без рядка заголовків.
+    """
+    def col_range(col: int) -> str:
+        letter = rowcol_to_a1(1, col)[:-1]
+        return f"{letter}2:{letter}"
+
+    cols = (SHEET1_REQUEST_NO_COL, SHEET1_MANAGER_PRICE_COL, SHEET1_USER_ID_COL)
+    value_ranges = get_worksheet1().batch_get([col_range(c) for c in cols], major_dimension="COLUMNS")
+    columns = [vr[0] if vr else [] for vr in value_ranges]
+    length = max(len(c) for c in columns)
+
+    def cell(column: list, i: int) -> str:
+        return column[i].strip() if i < len(column) else ""
+
+    return {
+        i + 2: tuple(cell(c, i) for c in columns)
+        for i in range(length)
+    }
+
+def delete_sheet1_row(row: int):
+    get_worksheet1().delete_rows(row)
+
+def delete_sheet1_rows(rows: list):
+    """Видаляє кілька рядків листа 1 одним batchUpdate, знизу вгору."""
+    rows = sorted(set(rows), reverse=True)
+    if not rows:
+        return
     ws = get_worksheet1()
-    ensure_columns(ws, 52)
+    ws.spreadsheet.batch_update({"requests": [
+        {
+            "deleteDimension": {
+                "range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": row - 1, "endIndex": row}
+            }
+        }
+        for row in rows
+    ]})
+
+class SheetRowKeys:
+    """
+    Кеш «номер заявки (стовпець A) -> рядок листа 1». Заявки зберігають лише
+    стабільний request_number, а рядок визначається через цю таблицю: видалення
+    рядка зсуває тільки кеш у пам'яті, записи заявок не змінюються.
+    Кеш повністю оновлюється поллером кожного циклу і точково — нашими записами.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self.loaded = False
+
+    def rebuild(self, rows: dict):
+        self._rows = dict(rows)
+        self.loaded = True
+
+    def get(self, request_number):
+        return self._rows.get(str(request_number).strip())
 
-    # Отримуємо значення першого стовпця
-    col_a = ws.col_values(1)
-    # Пропускаємо перший рядок (заголовки) і фільтруємо числові значення
+    def set(self, request_number, row: int):
+        self._rows[str(request_number).strip()] = row
+
+    def remove_row(self, row: int):
+        self.remove_rows([row])
+
+    def remove_rows(self, rows: list):
+        removed = sorted(set(rows))
+        self._rows = {
+            key: r - bisect.bisect_left(removed, r)
+            for key, r in self._rows.items()
+            if r not in removed
+        }
+
+SHEET1_ROW_KEYS = SheetRowKeys()
+
+def sheet1_row_keys(rows: dict) -> dict:
+    """{номер_заявки: рядок} з результату get_sheet1_poll_columns."""
+    return {key[0]: i for i, key in rows.items() if key[0]}
+
+# Скільки секунд знімок стовпців листа 1 вважається свіжим
+SHEET1_SNAPSHOT_TTL = float(os.getenv("SHEET1_SNAPSHOT_TTL_SECONDS", "30"))
+
+class Sheet1Snapshot:
+    """
+    Спільний знімок ключових стовпців листа 1 (A — номер заявки, N — ціна менеджера,
+    AZ — user_id; див. get_sheet1_poll_columns) з коротким TTL. Меню видалення,
+    масове видалення і поллер читають його замість окремих завантажень листа:
+    поки знімок свіжий — звернення до Sheets немає (hit), інакше один batchGet,
+    який поділяють усі, хто чекав одночасно (miss).
+    Власні записи бота підтримують знімок: новий рядок заявки дописується в нього,
+    видалення рядків і перенумерація його скидають. Кожне оновлення збільшує version.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # {рядок: (номер_заявки, ціна_менеджера, user_id)}; None — ще не завантажено або скинуто
+        self.rows = None
+        self.version = 0
+        # SHEET1_LAYOUT.version на момент читання — для SHEET1_LAYOUT.unstable_from
+        self.layout_version = 0
+        self.fetched_at = 0.0
+        self._epoch = 0
+        self._lock = None
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.invalidations = 0
+
+    def _fresh(self, max_age: float) -> bool:
+        return self.rows is not None and time.monotonic() - self.fetched_at < max_age
+
+    async def get(self, priority: int = SHEETS_PRIORITY_USER, max_age: float = None) -> tuple:
+        """
+        Повертає (rows, layout_version). max_age — допустимий вік знімка
+        (за замовчуванням TTL; 0 — примусово прочитати лист).
+        rows не можна змінювати: це спільний словник.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        if self._fresh(max_age):
+            self.hits += 1
+            return self.rows, self.layout_version
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Поки чекали лок, знімок міг оновити інший виклик
+            if self._fresh(max_age):
+                self.hits += 1
+                return self.rows, self.layout_version
+            self.misses += 1
+            epoch = self._epoch
+            layout_version = SHEET1_LAYOUT.version
+            rows = await run_sheets(get_sheet1_poll_columns, priority=priority)
+            # Якщо під час читання знімок скинули (видалення рядків), результат не кешуємо
+            if epoch == self._epoch:
+                self.rows, self.layout_version = rows, layout_version
+                self.fetched_at = time.monotonic()
+                self.version += 1
+            return rows, layout_version
+
+    def patch_row(self, row: int, key: tuple):
+        """Бот сам записав рядок (нова заявка) — знімок лишається свіжим."""
+        if self.rows is not None:
+            self.rows[row] = key
+            self.version += 1
+            self.patches += 1
+
+    def invalidate(self):
+        self.rows = None
+        self._epoch += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "rows": len(self.rows) if self.rows is not None else None,
+            "age_s": round(time.monotonic() - self.fetched_at, 1) if self.rows is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "patches": self.patches,
+            "invalidations": self.invalidations,
+        }
+
+SHEET1_SNAPSHOT = Sheet1Snapshot(SHEET1_SNAPSHOT_TTL)
+
+def legacy_sheet_row(rows: dict, app: dict):
+    """
+    Рядок старої заявки (без request_number): збережений sheet_row, але лише якщо
+    у стовпці AZ цього рядка її user_id. Інакше None — рядок з чужою заявкою
+    не фарбуємо і не видаляємо. rows — результат get_sheet1_poll_columns.
+    """
+    sheet_row = app.get("sheet_row")
+    if not sheet_row:
+        return None
+    if rows.get(sheet_row, ("", "", ""))[2] != str(app.get("user_id", "")):
+        logging.warning(f"Рядок {sheet_row} листа 1 не належить старій заявці користувача {app.get('user_id')}")
+        return None
+    return sheet_row
+
+async def resolve_sheet_row(app: dict):
+    """
+    Поточний рядок заявки в листі 1 (або None, якщо рядка вже немає).
+    Старі заявки без request_number користуються збереженим sheet_row,
+    звіреним зі стовпцем AZ (див. legacy_sheet_row).
+    """
+    request_number = app.get("request_number")
+    if not request_number:
+        if not app.get("sheet_row"):
+            return None
+        rows, _ = await SHEET1_SNAPSHOT.get()
+        return legacy_sheet_row(rows, app)
+    if not SHEET1_ROW_KEYS.loaded:
+        rows, _ = await SHEET1_SNAPSHOT.get()
+        SHEET1_ROW_KEYS.rebuild(sheet1_row_keys(rows))
+    return SHEET1_ROW_KEYS.get(request_number)
+
+async def find_legacy_applications(rows: dict, row: int) -> list:
+    """Старі заявки (без request_number), прив'язані до рядка row, чий user_id стоїть у стовпці AZ."""
+    row_uid = rows.get(row, ("", "", ""))[2]
+    return [
+        ref for ref in await find_applications_by_sheet_row(row)
+        if not ref[2].get("request_number") and row_uid and str(ref[0]) == row_uid
+    ]
+
+async def backfill_request_numbers(rows: dict) -> int:
+    """
+    Міграція старих заявок: заявкам без request_number проставляє номер зі стовпця A
+    їхнього sheet_row, якщо user_id у стовпці AZ збігається. Усі знайдені номери
+    записуються однією пакетною зміною сховища. Поллер повторює міграцію в кожному
+    стабільному циклі, поки старі заявки лишаються.
+    rows — результат get_sheet1_poll_columns. Повертає кількість старих заявок, що лишилися.
+    """
+    legacy = await run_store(APPLICATION_STORE.list_legacy)
+    items = []
+    taken = set()
+    for uid, idx, app in legacy:
+        request_number, _, row_uid = rows.get(app["sheet_row"], ("", "", ""))
+        if not request_number or row_uid != str(uid) or request_number in taken:
+            continue
+        if await find_application_by_request_number(request_number):
+            # Номер уже належить іншій заявці (дублікат старого запису)
+            continue
+        taken.add(request_number)
+        items.append((uid, idx, {"request_number": request_number}, app.get("version", 0)))
+    filled = await APPLICATION_STORE.update_many(items) if items else 0
+    if filled:
+        logging.info(f"Проставлено request_number для {filled} старих заявок")
+    return len(legacy) - filled
+
+def _sheet1_numbers(col_a: list) -> list:
+    """Числові номери заявок зі стовпця A (без рядка заголовків)."""
     numeric_values = []
     for value in col_a[1:]:
         try:
             numeric_values.append(int(value))
         except ValueError:
             continue
+    return numeric_values
 
-    # Якщо є числа, беремо останнє, інакше встановлюємо 0
+def scan_sheet1_request_numbers() -> tuple:
+    """
+    Повне читання стовпця A листа 1 (лише для RequestNumberAllocator.resync).
+    Повертає (останній_номер_заявки, перший_вільний_рядок).
+    """
+    col_a = get_worksheet1().col_values(SHEET1_REQUEST_NO_COL)
+    numeric_values = _sheet1_numbers(col_a)
+    # Якщо є числа, беремо останнє, інакше 0
     last_number = numeric_values[-1] if numeric_values else 0
-    new_request_number = last_number + 1
+    return last_number, len(col_a) + 1
+
+# На скільки рядків розширюється лист 1, коли нова заявка не вміщується в сітку
+SHEET1_GROW_ROWS = 100
 
-    # Обчислюємо номер нового рядка: це буде (кількість рядків + 1)
-    new_row = len(col_a) + 1
+class Sheet1RowTaken(Exception):
+    """Рядок, який RequestNumberAllocator вважав вільним, уже зайнятий (лист змінювали поза ботом)."""
 
-    # Записуємо номер заявки в першу клітинку нового рядка
-    ws.update_cell(new_row, 1, new_request_number)
+def _is_grid_limit_error(e: APIError) -> bool:
+    return e.response.status_code == 400 and "exceeds grid limits" in str(e)
 
-    # Далі оновлюємо інші клітинки (наприклад, дата, ПІБ тощо)
+def grow_sheet_rows(ws, min_rows: int):
+    """Дописує порожні рядки в кінець листа, щоб у ньому було щонайменше min_rows рядків."""
+    refresh_grid_size(ws)
+    missing = min_rows - ws.row_count
+    if missing <= 0:
+        return
+    length = max(missing, SHEET1_GROW_ROWS)
+    ws.spreadsheet.batch_update({"requests": [{
+        "appendDimension": {"sheetId": ws.id, "dimension": "ROWS", "length": length}
+    }]})
+    set_grid_size(ws, rows=ws.row_count + length)
+
+def update_google_sheet(data: dict, new_request_number: int, row: int, verify: bool = False):
+    """
+    Записує нову заявку з номером new_request_number у рядок row листа 1
+    (номер і рядок видає RequestNumberAllocator) одним запитом. verify=True —
+    спершу рядок читається, і якщо він уже не порожній — Sheet1RowTaken, нічого
+    не записується. Якщо лист закінчився — він розширюється.
+    """
+    ws = get_worksheet1()
+    ensure_columns(ws, SHEET1_ROW_WIDTH)
+
+    # Увесь рядок (стовпці A..AZ) збираємо в один вектор і записуємо одним запитом.
+    # None — клітинку не чіпаємо (API пропускає null-значення).
+    row_values = [None] * SHEET1_ROW_WIDTH
+
+    def put(col: int, value):
+        row_values[col - 1] = value
+
+    put(1, new_request_number)
+
+    # Далі інші клітинки (наприклад, дата, ПІБ тощо)
     current_date = datetime.now().strftime("%d.%m")
-    ws.update_cell(new_row, 2, current_date)
+    put(2, current_date)
     fullname = data.get("fullname", "")
     if isinstance(fullname, dict):
         fullname = fullname.get("fullname", "")
     fullname_lines = "\n".join(fullname.split())
-    ws.update_cell(new_row, 3, fullname_lines)
-    ws.update_cell(new_row, 4, data.get("fgh_name", ""))
-    ws.update_cell(new_row, 5, data.get("edrpou", ""))
-    ws.update_cell(new_row, 6, data.get("group", ""))
-    ws.update_cell(new_row, 7, data.get("culture", ""))
+    put(3, fullname_lines)
+    put(4, data.get("fgh_name", ""))
+    put(5, data.get("edrpou", ""))
+    put(6, data.get("group", ""))
+    put(7, data.get("culture", ""))
 
     quantity = data.get("quantity", "")
     if quantity:
         quantity = f"{quantity} Т"
-    ws.update_cell(new_row, 8, quantity)
+    put(8, quantity)
 
     region = data.get("region", "")
     district = data.get("district", "")
     city = data.get("city", "")
     location = f"Область: {region}\nРайон: {district}\nНас. пункт: {city}"
-    ws.update_cell(new_row, 9, location)
+    put(9, location)
 
     extra = data.get("extra_fields", {})
     extra_lines = []
     for key, value in extra.items():
         ukr_name = friendly_names.get(key, key.capitalize())
         extra_lines.append(f"{ukr_name}: {value}")
-    ws.update_cell(new_row, 10, "\n".join(extra_lines))
+    put(10, "\n".join(extra_lines))
 
-    ws.update_cell(new_row, 11, data.get("payment_form", ""))
+    put(11, data.get("payment_form", ""))
 
     currency_map = {"dollar": "Долар $", "euro": "Євро €", "uah": "Грн ₴"}
     curr = data.get("currency", "").lower()
-    ws.update_cell(new_row, 12, currency_map.get(curr, data.get("currency", "")))
+    put(12, currency_map.get(curr, data.get("currency", "")))
+
+    put(13, data.get("price", ""))
+    put(15, data.get("manager_price", ""))
+    put(16, data.get("phone", ""))
+    put(SHEET1_USER_ID_COL, data.get("user_id", ""))
+
+    # Рядок пишеться явно за адресою: append визначав би межі таблиці сам
+    # і міг би "провалитися" в порожній рядок посеред даних.
+    target = f"A{row}:{rowcol_to_a1(row, SHEET1_ROW_WIDTH)}"
+    if verify:
+        try:
+            existing = ws.get(target)
+        except APIError as e:
+            if not _is_grid_limit_error(e):
+                raise
+            grow_sheet_rows(ws, row)
+            existing = []
+        if any(cell.strip() for cells in existing for cell in cells):
+            raise Sheet1RowTaken(row)
+    # USER_ENTERED — як і update_cell, щоб дати/числа розпізнавались так само
+    try:
+        ws.update(target, [row_values], value_input_option="USER_ENTERED")
+    except APIError as e:
+        if not _is_grid_limit_error(e):
+            raise
+        grow_sheet_rows(ws, row)
+        ws.update(target, [row_values], value_input_option="USER_ENTERED")
+
+class RequestNumberAllocator:
+    """
+    Видає номери нових заявок і стежить за першим вільним рядком листа 1 без
+    читання стовпця A на кожну заявку. Стан (останній номер, наступний рядок)
+    тримається в пам'яті та зберігається у сховищі (get_meta / set_meta).
+    Видача номера і запис рядка серіалізуються asyncio-локом, тож дві одночасні
+    заявки не отримають однаковий номер. Рядок пишеться без попереднього читання.
+    Зі стовпцем A стан звіряється при старті та коли знімок листа 1 (його оновлює
+    поллер) показує заповнені рядки від next_row — їх додали поза ботом. Лише стан,
+    відновлений зі сховища (лист був недоступний), перед першим записом
+    перевіряється читанням цільового рядка.
+    """
 
-    ws.update_cell(new_row, 13, data.get("price", ""))
-    ws.update_cell(new_row, 15, data.get("manager_price", ""))
-    ws.update_cell(new_row, 16, data.get("phone", ""))
-    ws.update_cell(new_row, 52, data.get("user_id", ""))
+    META_KEY = "sheet1_request_numbers"
+
+    def __init__(self, store):
+        self.store = store
+        self.last_number = None
+        self.next_row = None
+        self._lock = None
+        # Стан не звірено з листом — наступний запис спершу читає свій рядок
+        self._verify = False
+        self.allocated = 0
+        self.resyncs = 0
+        self.conflicts = 0
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _restore(self) -> bool:
+        state = await run_store(self.store.get_meta, self.META_KEY)
+        if not state:
+            return False
+        self.last_number, self.next_row = state["last_number"], state["next_row"]
+        self._verify = True
+        return True
+
+    async def _persist(self):
+        state = {"last_number": self.last_number, "next_row": self.next_row}
+        await run_store(self.store.set_meta, self.META_KEY, state)
+
+    async def _resync(self):
+        self.last_number, self.next_row = await run_sheets(scan_sheet1_request_numbers)
+        self._verify = False
+        self.resyncs += 1
+        await self._persist()
+
+    async def sync(self):
+        """Звірка зі стовпцем A при старті; якщо таблиця недоступна — беремо збережений стан."""
+        async with self.lock:
+            try:
+                await self._resync()
+            except Exception as e:
+                restored = await self._restore()
+                logging.warning(
+                    f"Не вдалося прочитати номери заявок з листа 1: {e}. "
+                    f"{'Використовуємо збережений стан.' if restored else 'Повторимо при першій заявці.'}"
+                )
 
-    return new_row
+    async def submit(self, data: dict) -> tuple:
+        """Записує заявку в лист 1 під новим номером. Повертає (номер_рядка, номер_заявки)."""
+        async with self.lock:
+            if self.last_number is None and not await self._restore():
+                await self._resync()
+            elif self._taken_by_snapshot():
+                self.conflicts += 1
+                logging.warning(f"Знімок листа 1 показує заповнені рядки від {self.next_row}; перечитуємо номери заявок")
+                SHEET1_SNAPSHOT.invalidate()
+                await self._resync()
+            row, request_number = self.next_row, self.last_number + 1
+            try:
+                await run_sheets(update_google_sheet, data, request_number, row, self._verify)
+            except Sheet1RowTaken:
+                # Розкладка листа змінилася поза ботом — звіряємо номер і рядок зі стовпцем A
+                self.conflicts += 1
+                logging.warning(f"Рядок {row} листа 1 уже зайнятий; перечитуємо номери заявок")
+                SHEET1_SNAPSHOT.invalidate()
+                await self._resync()
+                row, request_number = self.next_row, self.last_number + 1
+                await run_sheets(update_google_sheet, data, request_number, row)
+            SHEET1_SNAPSHOT.patch_row(row, (str(request_number), "", str(data.get("user_id", ""))))
+            self._verify = False
+            self.last_number = request_number
+            self.next_row = row + 1
+            await self._persist()
+            self.allocated += 1
+            return row, str(request_number)
+
+    def _taken_by_snapshot(self) -> bool:
+        """Без звернення до Sheets: чи є в останньому знімку листа 1 заповнені рядки від next_row."""
+        rows = SHEET1_SNAPSHOT.rows
+        return rows is not None and any(row >= self.next_row and any(key) for row, key in rows.items())
+
+    async def rows_deleted(self, rows: list):
+        """Бот сам видалив рядки листа 1 — наступний вільний рядок зсувається вгору."""
+        if self.next_row is None:
+            return
+        self.next_row -= len({row for row in rows if row < self.next_row})
+        await self._persist()
+
+    def stats(self) -> dict:
+        return {
+            "last_number": self.last_number,
+            "next_row": self.next_row,
+            "allocated": self.allocated,
+            "resyncs": self.resyncs,
+            "conflicts": self.conflicts,
+        }
+
+REQUEST_NUMBERS = RequestNumberAllocator(APPLICATION_STORE)
 
 ############################################
 # ЗАФАРБОВУВАННЯ КЛІТИНОК У ТАБЛИЦІ2
 ############################################
 
-def color_price_cell_in_table2(row: int, fmt: cellFormat, col: int = 12):
-    ws2 = get_worksheet2()
-    cell_range = f"{rowcol_to_a1(row, col)}:{rowcol_to_a1(row, col)}"
-    format_cell_range(ws2, cell_range, fmt)
+TABLE2_FORMATS = {"red": red_format, "green": green_format, "yellow": yellow_format}
 
-def color_cell_red(row: int):
-    color_price_cell_in_table2(row, red_format, 12)
+# Колір клітинки з ціною за статусом заявки (для повного перефарбування)
+STATUS_COLOURS = {"rejected": "red", "deleted": "red", "waiting": "yellow", "confirmed": "green"}
 
-def color_cell_green(row: int):
-    color_price_cell_in_table2(row, green_format, 12)
+class PriceCellColours:
+    """
+    Стан кольорів стовпця цін таблиці 2: пам'ятає останній колір, надісланий
+    для кожного рядка, і не надсилає його повторно. Зміни йдуть через чергу записів
+    таблиці 2, тож усі пари (рядок, колір), передані за один раз, стають
+    repeatCell-запитами одного spreadsheets.batchUpdate.
+    """
 
-def color_cell_yellow(row: int):
-    color_price_cell_in_table2(row, yellow_format, 12)
+    def __init__(self, col: int = 12):
+        self.col = col
+        self._sent = {}
+        self.applied = 0
+        self.skipped = 0
+
+    def apply(self, pairs: list, force: bool = False) -> asyncio.Future:
+        """
+        pairs — [(рядок, "red" / "green" / "yellow"), ...]. force — надіслати навіть
+        ті кольори, які вже мали б стояти (перефарбування після ручних правок).
+        Повертає спільний future для всіх змін; чекати його не обов'язково.
+        """
+        queue = get_write_queue(GOOGLE_SPREADSHEET_ID2)
+        futures = []
+        for row, colour in pairs:
+            if not force and self._sent.get(row) == colour:
+                self.skipped += 1
+                continue
+            self._sent[row] = colour
+            cell_range = f"{rowcol_to_a1(row, self.col)}:{rowcol_to_a1(row, self.col)}"
+            future = queue.format_range(SHEET2_NAME, cell_range, TABLE2_FORMATS[colour])
+            future.add_done_callback(functools.partial(self._on_sent, row, colour))
+            futures.append(future)
+            self.applied += 1
+        return asyncio.gather(*futures, return_exceptions=True)
+
+    def _on_sent(self, row: int, colour: str, future):
+        # Не дійшло до таблиці — наступного разу колір треба надіслати знову
+        if (future.cancelled() or future.exception() is not None) and self._sent.get(row) == colour:
+            del self._sent[row]
+
+    def rows_deleted(self, rows: list):
+        """
+        Після delete_price_cells_in_table2 усе від найменшого видаленого рядка
+        білить і зсуває, тож ці рядки забуваємо.
+        """
+        if rows:
+            top_row = min(rows)
+            self._sent = {row: colour for row, colour in self._sent.items() if row < top_row}
+
+    def stats(self) -> dict:
+        return {"known_cells": len(self._sent), "applied": self.applied, "skipped": self.skipped}
+
+TABLE2_COLOURS = PriceCellColours(12)
+
+def color_price_cells_in_table2(pairs: list, force: bool = False) -> asyncio.Future:
+    """Кілька зафарбовувань [(рядок, колір), ...] одним запитом до таблиці2."""
+    return TABLE2_COLOURS.apply(pairs, force)
+
+def color_cell_red(row: int) -> asyncio.Future:
+    return color_price_cells_in_table2([(row, "red")])
+
+def color_cell_green(row: int) -> asyncio.Future:
+    return color_price_cells_in_table2([(row, "green")])
+
+def color_cell_yellow(row: int) -> asyncio.Future:
+    return color_price_cells_in_table2([(row, "yellow")])
+
+# Щоденне перефарбування таблиці 2 за станом заявок (год:хв за часом сервера, напр. 03:00).
+# За замовчуванням вимкнено: перефарбування перезаписує кольори, виставлені вручну
+TABLE2_RECOLOUR_AT = os.getenv("TABLE2_RECOLOUR_AT", "").strip()
+
+async def recolour_table2() -> int:
+    """
+    Перефарбовує клітинки з цінами всіх заявок зі статусом, що має колір,
+    одним batchUpdate — виправляє ручні правки і пропущені зафарбовування.
+    Повертає кількість клітинок.
+    """
+    rows, _ = await SHEET1_SNAPSHOT.get(SHEETS_PRIORITY_BACKGROUND)
+    if not SHEET1_ROW_KEYS.loaded:
+        SHEET1_ROW_KEYS.rebuild(sheet1_row_keys(rows))
+    pairs = {}
+    for status, colour in STATUS_COLOURS.items():
+        for _, _, app in await list_applications_by_status(status):
+            request_number = app.get("request_number")
+            row = SHEET1_ROW_KEYS.get(request_number) if request_number else legacy_sheet_row(rows, app)
+            if row:
+                pairs[row] = colour
+    color_price_cells_in_table2(sorted(pairs.items()), force=True)
+    await get_write_queue(GOOGLE_SPREADSHEET_ID2).flush()
+    return len(pairs)
+
+def parse_recolour_time(value: str):
+    """'03:00' -> (3, 0); порожній рядок — None (вимкнено). Некоректне значення — ValueError."""
+    if not value:
+        return None
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", value)
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"очікується год:хв (00:00–23:59), отримано {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+async def recolour_table2_nightly(hour: int, minute: int):
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            count = await recolour_table2()
+            logging.info(f"Таблицю 2 перефарбовано: {count} клітинок")
+        except Exception as e:
+            logging.exception(f"Помилка перефарбування таблиці 2: {e}")
 
 ############################################
 # ГОЛОВНІ КЛАВІАТУРИ (ЮЗЕР / АДМІН)
@@ -654,21 +3445,21 @@ def get_admin_requests_menu():
 @dp.message_handler(Text(equals="Видалення заявок"), state=AdminMenuStates.requests_section)
 async def handle_delete_applications(message: types.Message, state: FSMContext):
     """
-    Обробляє кнопку «Видалення заявок»: зчитує дані з Google Sheets і формує клавіатуру,
-    де для кожного рядка (з заявкою) показується номер заявки (значення клітинки A) та номер рядка.
+    Обробляє кнопку «Видалення заявок»: бере номери заявок (стовпець A) зі знімка
+    SHEET1_SNAPSHOT і формує клавіатуру, де для кожного рядка з заявкою показується
+    номер заявки та номер рядка.
     """
     try:
-        ws = get_worksheet1()
-        rows = ws.get_all_values()
-        if len(rows) <= 1:
+        rows, _ = await SHEET1_SNAPSHOT.get(SHEETS_PRIORITY_ADMIN)
+        if not rows:
             await message.answer("У таблиці немає заявок.", reply_markup=get_admin_requests_menu())
             return
 
         kb = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
-        # Пропускаємо заголовковий рядок
-        for i, row in enumerate(rows[1:], start=2):
-            if row and row[0].strip():
-                request_number = row[0].strip()
+        kb.add("Масове видалення")
+        for i, key in sorted(rows.items()):
+            request_number = key[0]
+            if request_number:
                 # Наприклад, "123 (рядок 5)"
                 btn_text = f"{request_number} (рядок {i})"
                 kb.add(btn_text)
@@ -679,6 +3470,92 @@ async def handle_delete_applications(message: types.Message, state: FSMContext):
         await message.answer("Помилка отримання заявок.", reply_markup=get_admin_requests_menu())
 
 
+BULK_DELETE_LIMIT = 2000
+
+def parse_request_numbers(text: str) -> list:
+    """
+    «10-25», «3, 7, 12» або їх суміш -> список номерів заявок (рядками, без повторів).
+    Порожній список, якщо формат невірний.
+    """
+    numbers = []
+    for token in re.split(r"[,;\s]+", text.strip()):
+        if not token:
+            continue
+        match = re.fullmatch(r"(\d+)\s*-\s*(\d+)|(\d+)", token)
+        if not match:
+            return []
+        if match.group(3):
+            numbers.append(int(match.group(3)))
+        else:
+            low, high = sorted((int(match.group(1)), int(match.group(2))))
+            if high - low >= BULK_DELETE_LIMIT:
+                return []
+            numbers.extend(range(low, high + 1))
+    return [str(n) for n in dict.fromkeys(numbers)][:BULK_DELETE_LIMIT]
+
+@dp.message_handler(Text(equals="Масове видалення"), state=AdminMenuStates.requests_section)
+async def handle_bulk_delete_start(message: types.Message, state: FSMContext):
+    kb = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
+    kb.add("Назад")
+    await message.answer(
+        "Введіть номери заявок для видалення: діапазон (наприклад, 10-25), "
+        "список через кому (3, 7, 12) або їх комбінацію.",
+        reply_markup=kb
+    )
+    await AdminReview.bulk_deletion_input.set()
+
+@dp.message_handler(state=AdminReview.bulk_deletion_input)
+async def handle_bulk_delete_input(message: types.Message, state: FSMContext):
+    if message.text == "Назад":
+        await AdminMenuStates.requests_section.set()
+        await message.answer("Розділ «Заявки».", reply_markup=get_admin_requests_menu())
+        return
+    numbers = parse_request_numbers(message.text)
+    if not numbers:
+        await message.answer(f"Невірний формат. Приклад: 10-25 або 3, 7, 12 (не більше {BULK_DELETE_LIMIT} заявок).")
+        return
+    try:
+        rows, _ = await SHEET1_SNAPSHOT.get(SHEETS_PRIORITY_ADMIN)
+        SHEET1_ROW_KEYS.rebuild(sheet1_row_keys(rows))
+    except Exception:
+        logging.exception("Помилка отримання заявок з Google Sheets")
+        await message.answer("Помилка отримання заявок.", reply_markup=get_admin_requests_menu())
+        await AdminMenuStates.requests_section.set()
+        return
+    existing = [n for n in numbers if SHEET1_ROW_KEYS.get(n)]
+    if not existing:
+        await message.answer("Жодної з цих заявок у таблиці немає. Введіть інші номери або «Назад».")
+        return
+    await state.update_data(bulk_deletion_numbers=existing)
+    preview = ", ".join(existing[:30]) + (" …" if len(existing) > 30 else "")
+    kb = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
+    kb.add("Так", "Ні")
+    await message.answer(
+        f"Буде видалено заявок: {len(existing)}\n{preview}\nПідтверджуєте?",
+        reply_markup=kb
+    )
+    await AdminReview.bulk_deletion_confirm.set()
+
+@dp.message_handler(Text(equals="Так"), state=AdminReview.bulk_deletion_confirm)
+async def handle_bulk_delete_yes(message: types.Message, state: FSMContext):
+    data = await state.get_data()
+    numbers = data.get("bulk_deletion_numbers") or []
+    await message.answer("Видаляємо, зачекайте...")
+    try:
+        deleted = await admin_remove_apps_bulk(numbers)
+        await message.answer(f"Видалено рядків: {deleted}.", reply_markup=get_admin_requests_menu())
+    except Exception as e:
+        logging.exception(f"Помилка масового видалення заявок: {e}")
+        await message.answer("Помилка видалення заявок.", reply_markup=get_admin_requests_menu())
+    await state.finish()
+    await AdminMenuStates.requests_section.set()
+
+@dp.message_handler(Text(equals="Ні"), state=AdminReview.bulk_deletion_confirm)
+async def handle_bulk_delete_no(message: types.Message, state: FSMContext):
+    await state.finish()
+    await AdminMenuStates.requests_section.set()
+    await message.answer("Видалення скасовано.", reply_markup=get_admin_requests_menu())
+
 @dp.message_handler(lambda message: re.match(r"^\d+\s\(рядок\s\d+\)$", message.text), state=AdminMenuStates.requests_section)
 async def handle_delete_application_selection(message: types.Message, state: FSMContext):
     """
@@ -687,34 +3564,35 @@ async def handle_delete_application_selection(message: types.Message, state: FSM
     Потім запитує підтвердження видалення з кнопками "Так" і "Ні".
     """
     text = message.text.strip()
-    match = re.search(r"\(рядок\s(\d+)\)$", text)
+    match = re.search(r"^(\d+)\s\(рядок\s(\d+)\)$", text)
     if not match:
         await message.answer("Невірний формат вибору.", reply_markup=get_admin_requests_menu())
         return
-    row_number = int(match.group(1))
-
-    apps = load_applications()
-    found = False
-    for uid, app_list in apps.items():
-        for idx, app in enumerate(app_list):
-            if app.get("sheet_row") == row_number:
-                # Зберігаємо дані про вибрану заявку в state
-                await state.update_data(
-                    deletion_uid=uid,
-                    deletion_app_index=idx,
-                    deletion_row_number=row_number
-                )
-                # Запитуємо підтвердження
-                kb = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
-                kb.add("Так", "Ні")
-                await message.answer(f"Ви хочете видалити заявку з рядка {row_number}?", reply_markup=kb)
-                await AdminReview.confirm_deletion_app.set()
-                found = True
-                break
-        if found:
-            break
+    row_number = int(match.group(2))
+
+    # Шукаємо за номером заявки: рядок міг зсунутися, поки адмін обирав.
+    # За sheet_row — лише старі заявки, яким номер ще не проставлено.
+    found = await find_application_by_request_number(match.group(1))
+    if not found:
+        legacy = [ref for ref in await find_applications_by_sheet_row(row_number) if not ref[2].get("request_number")]
+        if legacy:
+            found = legacy[0]
     if not found:
         await message.answer("Заявку не знайдено.", reply_markup=get_admin_requests_menu())
+        return
+
+    uid, idx, _ = found
+    # Зберігаємо дані про вибрану заявку в state
+    await state.update_data(
+        deletion_uid=uid,
+        deletion_app_index=idx,
+        deletion_row_number=row_number
+    )
+    # Запитуємо підтвердження
+    kb = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
+    kb.add("Так", "Ні")
+    await message.answer(f"Ви хочете видалити заявку з рядка {row_number}?", reply_markup=kb)
+    await AdminReview.confirm_deletion_app.set()
 
 
 @dp.message_handler(Text(equals="Так"), state=AdminReview.confirm_deletion_app)
@@ -795,8 +3673,7 @@ async def admin_moderation_section_handler(message: types.Message, state: FSMCon
     text = message.text.strip()
 
     if text == "Користувачі на модерацію":
-        users_data = load_users()
-        pending = users_data.get("pending_users", {})
+        pending = await get_users_by_status("pending")
 
         if not pending:
             await message.answer("Немає заявок на модерацію.", reply_markup=get_admin_moderation_menu())
@@ -814,8 +3691,7 @@ async def admin_moderation_section_handler(message: types.Message, state: FSMCon
         await state.update_data(pending_dict=pending, from_moderation_menu=True)
 
     elif text == "База користувачів":
-        users_data = load_users()
-        approved = users_data.get("approved_users", {})
+        approved = await get_users_by_status("approved")
         if not approved:
             await message.answer("Немає схвалених користувачів.", reply_markup=get_admin_moderation_menu())
             return
@@ -833,7 +3709,7 @@ async def admin_moderation_section_handler(message: types.Message, state: FSMCon
                 row = []
         if row:
             kb.row(*row)
-        kb.add("Вивантажити базу", "Назад")
+        kb.add("Вивантажити базу", "Вивантажити файлом", "Назад")
         await state.update_data(approved_dict=approved_dict, from_moderation_menu=True)
         await message.answer("Список схвалених користувачів (по два в рядку):", reply_markup=kb)
         await AdminReview.viewing_approved_list.set()
@@ -911,7 +3787,7 @@ async def admin_decision_pending_user(message: types.Message, state: FSMContext)
         return
 
     if message.text == "Дозволити":
-        approve_user(uid)
+        await approve_user(uid)
         response_text = "Користувача дозволено."
         # Надсилаємо йому повідомлення (uid - це рядок, тому int(uid))
         try:
@@ -923,7 +3799,7 @@ async def admin_decision_pending_user(message: types.Message, state: FSMContext)
         except Exception as e:
             logging.exception(f"Не вдалося надіслати повідомлення користувачу {uid}: {e}")
     else:
-        block_user(uid)
+        await block_user(uid)
         response_text = "Користувача заблоковано."
         try:
             await bot.send_message(
@@ -935,10 +3811,7 @@ async def admin_decision_pending_user(message: types.Message, state: FSMContext)
             logging.exception(f"Не вдалося надіслати повідомлення користувачу {uid}: {e}")
 
     # Прибираємо з pending_users
-    users_data = load_users()
-    if uid in users_data.get("pending_users", {}):
-        users_data["pending_users"].pop(uid)
-        save_users(users_data)
+    await remove_user(uid, "pending")
 
     # Відповідаємо адміну
     kb = types.ReplyKeyboardMarkup(resize_keyboard=True)
@@ -975,14 +3848,12 @@ async def admin_view_approved_users(message: types.Message, state: FSMContext):
         return
 
     user_id = approved_dict[text]
-    users_data = load_users()
-    approved_users = users_data.get("approved_users", {})
+    info = await get_approved_user(user_id)
 
-    if str(user_id) not in approved_users:
+    if info is None:
         await message.answer("Користувача не знайдено серед схвалених.")
         return
 
-    info = approved_users[str(user_id)]
     fullname = info.get("fullname", "—")
     phone = info.get("phone", "—")
 
@@ -1022,8 +3893,7 @@ async def admin_view_approved_single_user(message: types.Message, state: FSMCont
 
     if text == "Назад":
         # Повертаємось до списку схвалених
-        users_data = load_users()
-        approved = users_data.get("approved_users", {})
+        approved = await get_users_by_status("approved")
         if not approved:
             # Порожньо
             await message.answer("Наразі немає схвалених користувачів.", reply_markup=get_admin_moderation_menu())
@@ -1059,10 +3929,7 @@ async def admin_view_approved_single_user(message: types.Message, state: FSMCont
 
     elif text == "Видалити":
         # Повністю видаляємо користувача з approved_users
-        users_data = load_users()
-        if user_id_str in users_data.get("approved_users", {}):
-            users_data["approved_users"].pop(user_id_str)
-            save_users(users_data)
+        if await remove_user(user_id_str, "approved"):
             await message.answer("Користувача видалено із схвалених.", reply_markup=get_admin_moderation_menu())
         else:
             await message.answer("Користувача не знайдено у схвалених.", reply_markup=get_admin_moderation_menu())
@@ -1093,8 +3960,7 @@ async def admin_edit_approved_user_menu(message: types.Message, state: FSMContex
             await AdminMenuStates.moderation_section.set()
             return
 
-        users_data = load_users()
-        user_info = users_data.get("approved_users", {}).get(user_id_str, {})
+        user_info = await get_approved_user(user_id_str) or {}
         fullname = user_info.get("fullname", "—")
         phone = user_info.get("phone", "—")
         details = (
@@ -1139,16 +4005,12 @@ async def admin_edit_approved_user_fullname(message: types.Message, state: FSMCo
         await AdminMenuStates.moderation_section.set()
         return
 
-    users_data = load_users()
-    if user_id_str not in users_data.get("approved_users", {}):
+    # Оновлюємо ПІБ
+    if not await update_approved_user(user_id_str, {"fullname": new_fullname}):
         await message.answer("Користувача не знайдено в approved_users.", reply_markup=get_admin_moderation_menu())
         await AdminMenuStates.moderation_section.set()
         return
 
-    # Оновлюємо ПІБ
-    users_data["approved_users"][user_id_str]["fullname"] = new_fullname
-    save_users(users_data)
-
     # Повертаємось у меню редагування
     await message.answer("ПІБ успішно змінено!", reply_markup=remove_keyboard())
 
@@ -1177,16 +4039,12 @@ async def admin_edit_approved_user_phone(message: types.Message, state: FSMConte
         await AdminMenuStates.moderation_section.set()
         return
 
-    users_data = load_users()
-    if user_id_str not in users_data.get("approved_users", {}):
+    # Оновлюємо телефон
+    if not await update_approved_user(user_id_str, {"phone": new_phone}):
         await message.answer("Користувача не знайдено в approved_users.", reply_markup=get_admin_moderation_menu())
         await AdminMenuStates.moderation_section.set()
         return
 
-    # Оновлюємо телефон
-    users_data["approved_users"][user_id_str]["phone"] = new_phone
-    save_users(users_data)
-
     await message.answer("Номер телефону успішно змінено!", reply_markup=remove_keyboard())
 
     # Повертаємось у меню редагування
@@ -1208,16 +4066,10 @@ async def admin_requests_section_handler(message: types.Message, state: FSMConte
     text = message.text.strip()
     
     if text == "Підтверджені":
-        apps = load_applications()
-        confirmed_apps = []
-        for user_id, user_applications in apps.items():
-            for idx, app_data in enumerate(user_applications):
-                if app_data.get("proposal_status") == "confirmed":
-                    confirmed_apps.append({
-                        "user_id": user_id,
-                        "app_index": idx,
-                        "app_data": app_data
-                    })
+        confirmed_apps = [
+            {"user_id": user_id, "app_index": idx, "app_data": app_data}
+            for user_id, idx, app_data in await list_applications_by_status("confirmed")
+        ]
         if not confirmed_apps:
             await message.answer("Немає підтверджених заявок.", reply_markup=get_admin_requests_menu())
             return
@@ -1239,16 +4091,10 @@ async def admin_requests_section_handler(message: types.Message, state: FSMConte
         await message.answer("Список підтверджених заявок:", reply_markup=kb)
 
     elif text == "Видалені":
-        apps = load_applications()
-        deleted_apps = []
-        for user_id, user_applications in apps.items():
-            for idx, app_data in enumerate(user_applications):
-                if app_data.get("proposal_status") == "deleted":
-                    deleted_apps.append({
-                        "user_id": user_id,
-                        "app_index": idx,
-                        "app_data": app_data
-                    })
+        deleted_apps = [
+            {"user_id": user_id, "app_index": idx, "app_data": app_data}
+            for user_id, idx, app_data in await list_applications_by_status("deleted")
+        ]
         if not deleted_apps:
             await message.answer("Немає видалених заявок.", reply_markup=get_admin_requests_menu())
             return
@@ -1271,14 +4117,11 @@ async def admin_requests_section_handler(message: types.Message, state: FSMConte
 
     elif text == "Редагування заявок":
         # Перевіряємо, чи є користувачі з активними заявками
-        apps = load_applications()
         users_with_active_apps = {}
-        for uid, user_apps in apps.items():
-            active_apps = [app for app in user_apps if app.get("proposal_status") == "active"]
-            if active_apps:
-                user_info = load_users().get("approved_users", {}).get(uid, {})
-                display_name = user_info.get("fullname", f"User {uid}")
-                users_with_active_apps[display_name] = uid
+        approved = await get_users_by_status("approved")
+        for uid, _, _ in await list_applications_by_status("active"):
+            display_name = approved.get(uid, {}).get("fullname", f"User {uid}")
+            users_with_active_apps[display_name] = uid
         if not users_with_active_apps:
             await message.answer("Немає користувачів з активними заявками.", reply_markup=get_admin_requests_menu())
             return
@@ -1302,16 +4145,13 @@ async def admin_requests_section_handler(message: types.Message, state: FSMConte
 
 @dp.message_handler(Text(equals="Редагування заявок"), state=AdminMenuStates.requests_section)
 async def handle_editing_applications(message: types.Message, state: FSMContext):
-    apps = load_applications()
     users_with_active_apps = {}
+    approved = await get_users_by_status("approved")
     # Шукаємо користувачів, у яких є заявки зі статусом "active"
-    for uid, user_apps in apps.items():
-        active_apps = [app for app in user_apps if app.get("proposal_status") == "active"]
-        if active_apps:
-            # Спробуємо взяти ім'я користувача із схвалених, або використаємо uid
-            user_info = load_users().get("approved_users", {}).get(uid, {})
-            display_name = user_info.get("fullname", f"User {uid}")
-            users_with_active_apps[display_name] = uid
+    for uid, _, _ in await list_applications_by_status("active"):
+        # Спробуємо взяти ім'я користувача із схвалених, або використаємо uid
+        display_name = approved.get(uid, {}).get("fullname", f"User {uid}")
+        users_with_active_apps[display_name] = uid
     if not users_with_active_apps:
         await message.answer("Немає користувачів з активними заявками.", reply_markup=get_admin_requests_menu())
         return
@@ -1336,7 +4176,7 @@ async def admin_select_user_for_editing(message: types.Message, state: FSMContex
     if not uid:
         await message.answer("Будь ласка, оберіть користувача зі списку або натисніть 'Назад'.")
         return
-    user_apps = load_applications().get(uid, [])
+    user_apps = await get_user_applications(uid)
     if not user_apps:
         await message.answer("Для цього користувача немає заявок.", reply_markup=get_admin_requests_menu())
         await AdminMenuStates.requests_section.set()
@@ -1361,7 +4201,7 @@ async def admin_select_application_for_editing(message: types.Message, state: FS
         await message.answer("Помилка даних.", reply_markup=get_admin_requests_menu())
         await state.finish()
         return
-    user_apps = load_applications().get(uid, [])
+    user_apps = await get_user_applications(uid)
     match = re.match(r"^(\d+)\.", message.text.strip())
     if not match:
         await message.answer("Невірний формат. Спробуйте ще раз.")
@@ -1413,7 +4253,12 @@ async def update_app_status_via_edit(message: types.Message, state: FSMContext):
         new_status = "deleted"
     elif message.text == "Підтверджена":
         new_status = "confirmed"
-    update_application_status(int(uid), app_index, new_status)
+    await update_application_status(int(uid), app_index, new_status)
+    if new_status == "active":
+        # Підтверджена / видалена заявка знову приймає пропозиції менеджера
+        app = await get_application(int(uid), app_index)
+        if app is not None:
+            recheck_manager_price(app)
     await message.answer(f"Статус заявки оновлено на '{message.text}'.", reply_markup=get_admin_requests_menu())
     await AdminMenuStates.requests_section.set()
     await state.finish()
@@ -1427,7 +4272,7 @@ async def editing_app_status_back(message: types.Message, state: FSMContext):
         await message.answer("Помилка даних.", reply_markup=get_admin_requests_menu())
         await state.finish()
         return
-    user_apps = load_applications().get(uid, [])
+    user_apps = await get_user_applications(uid)
     kb = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
     for i, app in enumerate(user_apps, start=1):
         culture = app.get("culture", "Невідомо")
@@ -1544,7 +4389,7 @@ async def admin_view_confirmed_app_handler(message: types.Message, state: FSMCon
     elif message.text == "Видалити":
         user_id = int(selected_entry["user_id"])
         app_index = selected_entry["app_index"]
-        update_application_status(user_id, app_index, "deleted")
+        await update_application_status(user_id, app_index, "deleted")
         if 0 <= chosen_index < len(confirmed_apps):
             confirmed_apps.pop(chosen_index)
         await state.update_data(confirmed_apps=confirmed_apps, selected_confirmed=None, chosen_confirmed_index=None)
@@ -1684,18 +4529,17 @@ async def admin_view_deleted_app_handler(message: types.Message, state: FSMConte
 async def cmd_start(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     await state.finish()
-    users = load_users()
-    uid = str(user_id)
+    status = await get_user_status(user_id)
 
-    if uid in users.get("blocked_users", []):
+    if status == "blocked":
         await message.answer("На жаль, у Вас немає доступу.", reply_markup=remove_keyboard())
         return
 
-    if uid in users.get("approved_users", {}):
+    if status == "approved":
         await message.answer("Вітаємо! Оберіть дію:", reply_markup=get_main_menu_keyboard())
         return
 
-    if uid in users.get("pending_users", {}):
+    if status == "pending":
         await message.answer("Ваша заявка на модерацію вже відправлена. Очікуйте.", reply_markup=remove_keyboard())
         return
 
@@ -1757,26 +4601,21 @@ async def confirm_registration_preview(message: types.Message, state: FSMContext
     user_id = message.from_user.id
     uid = str(user_id)
 
-    users = load_users()
-    users.setdefault("pending_users", {})[uid] = {
+    await add_pending_user(uid, {
         "fullname": fullname,
         "phone": phone,
         "timestamp": datetime.now().isoformat()
-    }
-    save_users(users)
+    })
 
     await state.finish()
     await message.answer("Ваша заявка на модерацію відправлена.", reply_markup=remove_keyboard())
 
     for admin in ADMINS:
-        try:
-            await bot.send_message(
-                admin,
-                f"Новий користувач на модерацію:\nПІБ: {fullname}\nНомер: {phone}\nUser ID: {user_id}",
-                reply_markup=remove_keyboard()
-            )
-        except Exception as e:
-            logging.exception(f"Не вдалося сповістити адміністратора {admin}: {e}")
+        NOTIFIER.enqueue(
+            admin,
+            f"Новий користувач на модерацію:\nПІБ: {fullname}\nНомер: {phone}\nUser ID: {user_id}",
+            reply_markup=remove_keyboard()
+        )
 
 @dp.message_handler(Text(equals="Редагувати"), state=RegistrationStates.preview)
 async def edit_registration_preview(message: types.Message, state: FSMContext):
@@ -1838,9 +4677,7 @@ async def return_to_editing_menu(message: types.Message, state: FSMContext):
 @dp.message_handler(commands=["menu"], state="*")
 async def show_menu(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    users = load_users()
-    uid = str(user_id)
-    if uid not in users.get("approved_users", {}):
+    if await get_user_status(user_id) != "approved":
         await message.answer("Немає доступу. Очікуйте схвалення.", reply_markup=remove_keyboard())
         return
     await state.finish()
@@ -1874,9 +4711,7 @@ async def start_application(message: types.Message, state: FSMContext):
 @dp.message_handler(Text(equals="Переглянути мої заявки"), state="*")
 async def show_user_applications(message: types.Message):
     user_id = message.from_user.id
-    uid = str(user_id)
-    apps = load_applications()
-    user_apps = apps.get(uid, [])
+    user_apps = await get_user_applications(user_id)
 
     if not user_apps:
         await message.answer("Ви не маєте заявок.", reply_markup=get_main_menu_keyboard())
@@ -1913,9 +4748,7 @@ async def show_user_applications(message: types.Message):
 @dp.message_handler(Regexp(r"^(\d+)\.\s(.+)\s\|\s(.+)\sт(?:\s✅)?$"), state="*")
 async def view_application_detail(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    uid = str(user_id)
-    apps = load_applications()
-    user_apps = apps.get(uid, [])
+    user_apps = await get_user_applications(user_id)
 
     match = re.match(r"^(\d+)\.\s(.+)\s\|\s(.+)\sт(?:\s✅)?$", message.text.strip())
     if not match:
@@ -2031,9 +4864,7 @@ async def view_proposal(message: types.Message, state: FSMContext):
         await message.answer("Немає даних про заявку.", reply_markup=remove_keyboard())
         return
 
-    uid = str(message.from_user.id)
-    apps = load_applications()
-    user_apps = apps.get(uid, [])
+    user_apps = await get_user_applications(message.from_user.id)
     if index < 0 or index >= len(user_apps):
         await message.answer("Невірна заявка.", reply_markup=remove_keyboard())
         return
@@ -2067,12 +4898,14 @@ async def view_proposal(message: types.Message, state: FSMContext):
 async def proposal_rejected(message: types.Message, state: FSMContext):
     data = await state.get_data()
     index = data.get("selected_app_index")
-    update_application_status(message.from_user.id, index, "rejected")
+    app = await get_application(message.from_user.id, index)
+    if app is None:
+        await message.answer("Заявку не знайдено.", reply_markup=get_main_menu_keyboard())
+        await state.finish()
+        return
+    await update_application_status(message.from_user.id, index, "rejected")
 
-    apps = load_applications()
-    uid = str(message.from_user.id)
-    app = apps[uid][index]
-    sheet_row = app.get("sheet_row")
+    sheet_row = await resolve_sheet_row(app)
     if sheet_row:
         color_cell_red(sheet_row)
 
@@ -2086,17 +4919,16 @@ async def proposal_rejected(message: types.Message, state: FSMContext):
 async def wait_after_rejection(message: types.Message, state: FSMContext):
     data = await state.get_data()
     index = data.get("selected_app_index")
-    update_application_status(message.from_user.id, index, "waiting")
+    app = await get_application(message.from_user.id, index)
+    if app is None:
+        await message.answer("Заявку не знайдено.", reply_markup=get_main_menu_keyboard())
+        await state.finish()
+        return
+    await update_application_fields(message.from_user.id, index, {"proposal_status": "waiting", "onceWaited": True})
 
-    apps = load_applications()
-    uid = str(message.from_user.id)
-    app = apps[uid][index]
-    app["onceWaited"] = True
-    sheet_row = app.get("sheet_row")
+    sheet_row = await resolve_sheet_row(app)
     if sheet_row:
         color_cell_yellow(sheet_row)
-
-    save_applications(apps)
     await message.answer("Заявка оновлена. Ви будете повідомлені при появі кращої пропозиції.",
                          reply_markup=get_main_menu_keyboard())
     await state.finish()
@@ -2105,9 +4937,7 @@ async def wait_after_rejection(message: types.Message, state: FSMContext):
 async def delete_after_rejection(message: types.Message, state: FSMContext):
     data = await state.get_data()
     index = data.get("selected_app_index")
-    uid = str(message.from_user.id)
-    apps = load_applications()
-    user_apps = apps.get(uid, [])
+    user_apps = await get_user_applications(message.from_user.id)
 
     if index is None or index < 0 or index >= len(user_apps):
         await message.answer("Невірна заявка.", reply_markup=get_main_menu_keyboard())
@@ -2115,11 +4945,11 @@ async def delete_after_rejection(message: types.Message, state: FSMContext):
         return
 
     app = user_apps[index]
-    sheet_row = app.get("sheet_row")
+    sheet_row = await resolve_sheet_row(app)
     if sheet_row:
         color_cell_red(sheet_row)
 
-    delete_application_soft(message.from_user.id, index)
+    await delete_application_soft(message.from_user.id, index)
     await message.answer("Ваша заявка видалена (позначена як 'deleted').", reply_markup=get_main_menu_keyboard())
     await state.finish()
 
@@ -2131,18 +4961,19 @@ async def delete_after_rejection(message: types.Message, state: FSMContext):
 async def confirm_proposal(message: types.Message, state: FSMContext):
     data = await state.get_data()
     index = data.get("selected_app_index")
-    update_application_status(message.from_user.id, index, "confirmed")
-
-    apps = load_applications()
     uid = str(message.from_user.id)
-    app = apps[uid][index]
+    app = await get_application(uid, index)
+    if app is None:
+        await message.answer("Заявку не знайдено.", reply_markup=get_main_menu_keyboard())
+        await state.finish()
+        return
+    await update_application_status(uid, index, "confirmed")
+    app = await get_application(uid, index)
 
-    sheet_row = app.get("sheet_row")
+    sheet_row = await resolve_sheet_row(app)
     if sheet_row:
         color_cell_green(sheet_row)
 
-    save_applications(apps)
-
     timestamp = app.get("timestamp", "")
     try:
         dt = datetime.fromisoformat(timestamp)
@@ -2162,14 +4993,12 @@ async def confirm_proposal(message: types.Message, state: FSMContext):
     user_fullname = app.get("fullname", "")
     phone_from_app = app.get("phone", "")
     if not phone_from_app:
-        users = load_users()
-        phone_from_app = users.get("approved_users", {}).get(uid, {}).get("phone", "")
+        phone_from_app = (await get_approved_user(uid) or {}).get("phone", "")
     if not phone_from_app:
         phone_from_app = "—"
 
     if not user_fullname:
-        users = load_users()
-        user_fullname = users.get("approved_users", {}).get(uid, {}).get("fullname", "—")
+        user_fullname = (await get_approved_user(uid) or {}).get("fullname", "—")
 
     user_fullname_line = f"Користувач: {user_fullname}"
     user_phone_line = f"Телефон: {phone_from_app}"
@@ -2196,10 +5025,7 @@ async def confirm_proposal(message: types.Message, state: FSMContext):
     )
 
     for admin_id in ADMINS:
-        try:
-            await bot.send_message(admin_id, admin_msg)
-        except Exception as e:
-            logging.exception(f"Не вдалося відправити підтвердження адміну {admin_id}: {e}")
+        NOTIFIER.enqueue(admin_id, admin_msg)
 
     await message.answer("Ви підтвердили пропозицію. Очікуйте на подальші дії від менеджера/адміністратора.",
                          reply_markup=get_main_menu_keyboard())
@@ -2220,9 +5046,7 @@ async def delete_request(message: types.Message, state: FSMContext):
 async def confirm_deletion(message: types.Message, state: FSMContext):
     data = await state.get_data()
     index = data.get("selected_app_index")
-    uid = str(message.from_user.id)
-    apps = load_applications()
-    user_apps = apps.get(uid, [])
+    user_apps = await get_user_applications(message.from_user.id)
 
     if index is None or index < 0 or index >= len(user_apps):
         await message.answer("Невірна заявка.", reply_markup=get_main_menu_keyboard())
@@ -2230,11 +5054,11 @@ async def confirm_deletion(message: types.Message, state: FSMContext):
         return
 
     app = user_apps[index]
-    sheet_row = app.get("sheet_row")
+    sheet_row = await resolve_sheet_row(app)
     if sheet_row:
         color_cell_red(sheet_row)
 
-    delete_application_soft(message.from_user.id, index)
+    await delete_application_soft(message.from_user.id, index)
 
     await message.answer("Ваша заявка видалена (позначена як 'deleted').", reply_markup=get_main_menu_keyboard())
     await state.finish()
@@ -2395,17 +5219,18 @@ async def confirm_application_handler(message: types.Message, state: FSMContext)
         return
 
     if "fullname" not in webapp_data or not webapp_data.get("fullname"):
-        users = load_users()
-        approved_user_info = users.get("approved_users", {}).get(str(user_id), {})
+        approved_user_info = await get_approved_user(user_id) or {}
         webapp_data["fullname"] = approved_user_info.get("fullname", "")
 
     webapp_data["chat_id"] = str(message.chat.id)
     webapp_data["original_manager_price"] = webapp_data.get("manager_price", "")
 
     try:
-        sheet_row = update_google_sheet(webapp_data)
+        sheet_row, request_number = await REQUEST_NUMBERS.submit(webapp_data)
         webapp_data["sheet_row"] = sheet_row
-        add_application(user_id, message.chat.id, webapp_data)
+        webapp_data["request_number"] = request_number
+        SHEET1_ROW_KEYS.set(request_number, sheet_row)
+        await add_application(user_id, message.chat.id, webapp_data)
 
         await state.finish()
         await message.answer("Ваша заявка прийнята!", reply_markup=get_main_menu_keyboard())
@@ -2414,75 +5239,227 @@ async def confirm_application_handler(message: types.Message, state: FSMContext)
         await message.answer("Сталася помилка при збереженні. Спробуйте пізніше.", reply_markup=remove_keyboard())
         await state.finish()
 
+############################################
+# ДОСТАВКА СПОВІЩЕНЬ З OUTBOX
+############################################
+
+def outbox_message(app: dict, version: int, text: str) -> dict:
+    """
+    Сповіщення для outbox. Ключ прив'язаний до заявки і версії, яку створює зміна,
+    тож повторна обробка тієї самої зміни не створить другого повідомлення.
+    """
+    key = f"app:{app.get('user_id')}:{app.get('timestamp')}:v{version}"
+    return {"key": key, "chat_id": app.get("chat_id"), "text": text}
+
+class OutboxRelay:
+    """
+    Фоновий воркер: забирає недоставлені сповіщення зі сховища, передає їх у NOTIFIER
+    і після відправки підтверджує (видаляє) їх пачкою, одним записом на цикл.
+    Доставка «щонайменше один раз»: якщо процес впаде між відправкою і
+    підтвердженням, повідомлення буде надіслано повторно після рестарту.
+    """
+
+    def __init__(self, store, notifier: NotificationDispatcher, interval: float):
+        self.store = store
+        self.notifier = notifier
+        self.interval = interval
+        self._in_flight = set()
+        self._delivered = []
+        self._wake = None
+        self._task = None
+        self.acked = 0
+        self.dropped = 0
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """Нові записи в outbox — не чекати наступного циклу."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def stop(self):
+        """Зупинити нові вибірки; підтвердження вже відправлених — через flush()."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._in_flight), "acked": self.acked, "dropped": self.dropped}
+
+    async def _run(self):
+        while True:
+            try:
+                await self._sweep()
+            except Exception as e:
+                logging.exception(f"Помилка доставки outbox: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _sweep(self):
+        await self.flush()
+        # Надсилаємо лише сповіщення, чий запис уже на диску (fsync журналу — у фоні)
+        await self.store.sync_journal()
+        for msg in await run_store(self.store.pending_outbox):
+            key = msg["key"]
+            if key in self._in_flight:
+                continue
+            self._in_flight.add(key)
+            self.notifier.enqueue(msg["chat_id"], msg["text"], callback=functools.partial(self._on_result, key))
+
+    def _on_result(self, key: str, error):
+        if error is None:
+            self._delivered.append(key)
+        elif isinstance(error, (Unauthorized, BadRequest)):
+            # Бот заблоковано / чат не існує — повтор не допоможе
+            self.dropped += 1
+            self._delivered.append(key)
+        else:
+            # Спробуємо ще раз у наступному циклі
+            self._in_flight.discard(key)
+
+    async def flush(self):
+        if not self._delivered:
+            return
+        keys, self._delivered = self._delivered, []
+        await run_store(self.store.ack_outbox, keys)
+        self.acked += len(keys)
+        self._in_flight.difference_update(keys)
+
+OUTBOX_INTERVAL = float(os.getenv("OUTBOX_INTERVAL_SECONDS", "2"))
+OUTBOX_RELAY = OutboxRelay(APPLICATION_STORE, NOTIFIER, OUTBOX_INTERVAL)
+
 ############################################
 # ФОНОВИЙ ЦИКЛ ПЕРЕВІРКИ manager_price
 ############################################
 
+# Заявки, чий рядок поллер має перевірити знову, хоч значення в листі не змінилися:
+# номер заявки або sheet_row старої заявки без номера
+POLL_RECHECK = set()
+
+def recheck_manager_price(app: dict):
+    """
+    Заявку щойно збережено або її статус знову приймає пропозиції — поллер
+    забуває її рядок у своєму знімку і в наступному циклі перевіряє ціну менеджера.
+    """
+    key = app.get("request_number") or app.get("sheet_row")
+    if key:
+        POLL_RECHECK.add(key)
+
+async def apply_manager_price(row: int, uid: str, app_index: int, app: dict, current_manager_price_str: str) -> bool:
+    """
+    Нова ціна менеджера для заявки: оновлює пропозицію і ставить сповіщення в outbox
+    тим самим записом. Повертає False, якщо рядок треба перевірити ще раз
+    (заявку змінено паралельно).
+    """
+    idx = app_index + 1
+    status = app.get("proposal_status", "active")
+    if status in ("deleted", "confirmed"):
+        # Пропозиції не приймаються; якщо статус зміниться, recheck_manager_price поверне рядок на перевірку
+        return True
+    version = app.get("version", 0)
+
+    original_manager_price_str = app.get("original_manager_price", "").strip()
+    try:
+        orig_price = float(original_manager_price_str) if original_manager_price_str else None
+    except:
+        orig_price = None
+
+    if orig_price is None:
+        culture = app.get("culture", "Невідомо")
+        quantity = app.get("quantity", "Невідомо")
+        notification = outbox_message(
+            app, version + 1,
+            f"Нова пропозиція по Вашій заявці {idx}. {culture} | {quantity} т. Ціна: {current_manager_price_str}"
+        )
+        if not await update_application_fields(uid, app_index, {
+            "original_manager_price": current_manager_price_str,
+            "proposal": current_manager_price_str,
+            "proposal_status": "Agreed",
+        }, expected_version=version, outbox=[notification]):
+            logging.info(f"Заявку в рядку {row} змінено паралельно, перевіримо в наступному циклі")
+            return False
+        OUTBOX_RELAY.wake()
+        return True
+
+    previous_proposal = app.get("proposal")
+    if previous_proposal == current_manager_price_str:
+        # Нічого не змінилося — жодного запису на диск
+        return True
+    if status == "waiting":
+        culture = app.get("culture", "Невідомо")
+        quantity = app.get("quantity", "Невідомо")
+        text = f"Ціна по заявці {idx}. {culture} | {quantity} т змінилась з {previous_proposal} на {current_manager_price_str}"
+    else:
+        text = f"Для Вашої заявки оновлено пропозицію: {current_manager_price_str}"
+    if not await update_application_fields(uid, app_index, {
+        "original_manager_price": previous_proposal,
+        "proposal": current_manager_price_str,
+        "proposal_status": "Agreed",
+    }, expected_version=version, outbox=[outbox_message(app, version + 1, text)]):
+        logging.info(f"Заявку в рядку {row} змінено паралельно, перевіримо в наступному циклі")
+        return False
+    OUTBOX_RELAY.wake()
+    return True
+
 async def poll_manager_proposals():
-    global POLLING_PAUSED
+    """
+    Раз на CHECK_INTERVAL читає стовпці A, N, AZ листа 1 і порівнює їх зі знімком
+    попереднього циклу — обробляються лише рядки, значення яких змінилися.
+    """
+    # {номер_рядка: (номер_заявки, ціна_менеджера, user_id)} на момент останньої обробки
+    poll_snapshot = {}
+    # Чи лишилися старі заявки без request_number (спершу — невідомо)
+    legacy_left = True
     while True:
-        if POLLING_PAUSED:
-            await asyncio.sleep(3)
-            continue
-
         try:
-            ws = get_worksheet1()
-            rows = ws.get_all_values()
-            apps = load_applications()
-            for i, row in enumerate(rows[1:], start=2):
-                if len(row) < 15:
-                    continue
-                current_manager_price_str = row[13].strip()
+            rows, layout_version = await SHEET1_SNAPSHOT.get(SHEETS_PRIORITY_BACKGROUND)
+            # Якщо під час читання видалявся рядок, усе від нього вниз могло зсунутися —
+            # ці рядки не чіпаємо і не запам'ятовуємо, їх перевірить наступний цикл
+            unstable_row = SHEET1_LAYOUT.unstable_from(layout_version)
+            if unstable_row is None:
+                SHEET1_ROW_KEYS.rebuild(sheet1_row_keys(rows))
+                for key in POLL_RECHECK:
+                    poll_snapshot.pop(SHEET1_ROW_KEYS.get(key) if isinstance(key, str) else key, None)
+                POLL_RECHECK.clear()
+                if legacy_left:
+                    legacy_left = await backfill_request_numbers(rows)
+            changed = [
+                i for i, key in rows.items()
+                if poll_snapshot.get(i) != key and (unstable_row is None or i < unstable_row)
+            ]
+            # Рядки, що зникли (видалення в кінці листа), прибираємо зі знімка
+            for i in set(poll_snapshot) - set(rows):
+                del poll_snapshot[i]
+
+            for i in changed:
+                current_manager_price_str = rows[i][1]
                 if not current_manager_price_str:
+                    poll_snapshot[i] = rows[i]
                     continue
                 try:
                     cur_price = float(current_manager_price_str)
                 except ValueError:
+                    poll_snapshot[i] = rows[i]
                     continue
 
-                for uid, app_list in apps.items():
-                    for idx, app in enumerate(app_list, start=1):
-                        if app.get("sheet_row") == i:
-                            status = app.get("proposal_status", "active")
-                            if status in ("deleted", "confirmed"):
-                                continue
-
-                            original_manager_price_str = app.get("original_manager_price", "").strip()
-                            try:
-                                orig_price = float(original_manager_price_str) if original_manager_price_str else None
-                            except:
-                                orig_price = None
-
-                            if orig_price is None:
-                                culture = app.get("culture", "Невідомо")
-                                quantity = app.get("quantity", "Невідомо")
-                                app["original_manager_price"] = current_manager_price_str
-                                app["proposal"] = current_manager_price_str
-                                app["proposal_status"] = "Agreed"
-                                await bot.send_message(
-                                    app.get("chat_id"),
-                                    f"Нова пропозиція по Вашій заявці {idx}. {culture} | {quantity} т. Ціна: {current_manager_price_str}"
-                                )
-                            else:
-                                previous_proposal = app.get("proposal")
-                                if previous_proposal != current_manager_price_str:
-                                    app["original_manager_price"] = previous_proposal
-                                    app["proposal"] = current_manager_price_str
-                                    app["proposal_status"] = "Agreed"
-
-                                    if status == "waiting":
-                                        culture = app.get("culture", "Невідомо")
-                                        quantity = app.get("quantity", "Невідомо")
-                                        await bot.send_message(
-                                            app.get("chat_id"),
-                                            f"Ціна по заявці {idx}. {culture} | {quantity} т змінилась з {previous_proposal} на {current_manager_price_str}"
-                                        )
-                                    else:
-                                        await bot.send_message(
-                                            app.get("chat_id"),
-                                            f"Для Вашої заявки оновлено пропозицію: {current_manager_price_str}"
-                                        )
-            save_applications(apps)
+                found = await find_application_by_request_number(rows[i][0]) if rows[i][0] else None
+                # Старі заявки без номера — усі, що прив'язані до цього рядка
+                targets = [found] if found else await find_legacy_applications(rows, i)
+                if not targets:
+                    # Заявку ще не збережено — add_application поверне рядок на перевірку
+                    poll_snapshot[i] = rows[i]
+                    continue
+                processed = [
+                    await apply_manager_price(i, uid, app_index, app, current_manager_price_str)
+                    for uid, app_index, app in targets
+                ]
+                if all(processed):
+                    poll_snapshot[i] = rows[i]
         except Exception as e:
             logging.exception(f"Помилка у фоні: {e}")
 
@@ -2506,9 +5483,26 @@ async def handle_webapp_data(request: web.Request):
         logging.exception(f"API: Помилка: {e}")
         return web.json_response({"status": "error", "error": str(e)})
 
+async def handle_metrics(request: web.Request):
+    """Стан пулів потоків і черги сповіщень — для підбору SHEETS_WORKERS / NOTIFY_WORKERS."""
+    return web.json_response(dict(
+        get_pool_stats(),
+        notifications=NOTIFIER.stats(),
+        outbox=OUTBOX_RELAY.stats(),
+        sheet_writes={queue.spreadsheet_id: queue.stats() for queue in _write_queues.values()},
+        sheets_quota=get_sheets_quota_stats(),
+        request_numbers=REQUEST_NUMBERS.stats(),
+        table2_colours=TABLE2_COLOURS.stats(),
+        export=EXPORT_SHEET.stats(),
+        sheet1_snapshot=SHEET1_SNAPSHOT.stats(),
+    ))
+
 async def start_webserver():
     app_web = web.Application()
-    app_web.add_routes([web.post('/api/webapp_data', handle_webapp_data)])
+    app_web.add_routes([
+        web.post('/api/webapp_data', handle_webapp_data),
+        web.get('/api/metrics', handle_metrics),
+    ])
     runner = web.AppRunner(app_web)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', API_PORT)
@@ -2521,12 +5515,41 @@ async def start_webserver():
 
 async def on_startup(dp):
     logging.info("Бот запущено. Старт фонових задач...")
+    # Повідомлення ще не приймаються, тож початкове завантаження можна виконати на event loop
+    # (перенесення старого журналу заявок у SQLite стискає його через DISK_POOL)
+    USER_STORE.init()
+    APPLICATION_STORE.load()
+    NOTIFIER.start()
+    OUTBOX_RELAY.start()
+    asyncio.create_task(REQUEST_NUMBERS.sync())
+    try:
+        recolour_at = parse_recolour_time(TABLE2_RECOLOUR_AT)
+    except ValueError as e:
+        logging.error(f"TABLE2_RECOLOUR_AT: {e}. Щоденне перефарбування таблиці 2 вимкнено.")
+        recolour_at = None
+    if recolour_at is not None:
+        asyncio.create_task(recolour_table2_nightly(*recolour_at))
     asyncio.create_task(poll_manager_proposals())
     asyncio.create_task(start_webserver())
 
+############################################
+# on_shutdown
+############################################
+
+async def on_shutdown(dp):
+    logging.info("Зупинка бота. Зберігаємо заявки на диск...")
+    OUTBOX_RELAY.stop()
+    await NOTIFIER.stop()
+    await OUTBOX_RELAY.flush()
+    await flush_sheet_writes()
+    await run_store(APPLICATION_STORE.close)
+    SHEETS_POOL.shutdown()
+    DISK_POOL.shutdown()
+    EXPORT_POOL.shutdown()
+
 ############################################
 # ТОЧКА ВХОДУ
 ############################################
 
 if __name__ == '__main__':
-    executor.start_polling(dp, skip_updates=True, on_startup=on_startup)
+    executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
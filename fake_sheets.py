@@ -0,0 +1,643 @@
+# -*- coding: utf-8 -*-
+"""
+Імітація Google Sheets API v4 у пам'яті — для бенчмарків і перевірок без мережі.
+
+FakeSheetsSession підставляється в gspread.Client замість AuthorizedSession
+і відповідає на ті запити, які gspread робить для бота:
+    GET  /v4/spreadsheets/{id}                       — метадані (листи, розміри)
+    POST /v4/spreadsheets/{id}:batchUpdate           — repeatCell, deleteDimension,
+                                                       insertDimension, appendDimension,
+                                                       deleteRange,
+                                                       addSheet, deleteSheet,
+                                                       updateSheetProperties,
+                                                       updateDimensionProperties
+    GET  /v4/spreadsheets/{id}/values/{range}        — values.get
+    PUT  /v4/spreadsheets/{id}/values/{range}        — values.update
+    POST /v4/spreadsheets/{id}/values/{range}:append — values.append
+    POST /v4/spreadsheets/{id}/values/{range}:clear  — values.clear
+    GET  /v4/spreadsheets/{id}/values:batchGet       — values.batchGet
+    POST /v4/spreadsheets/{id}/values:batchUpdate    — values.batchUpdate
+
+Кожен виклик рахується в session.calls за назвою методу API. Можна задати затримку
+(latency) і частку відповідей 429 (error_rate), або примусово зламати наступні
+виклики через fail_next().
+
+Приклад:
+    session = FakeSheetsSession()
+    session.add_sheet("sheet-id", "Лист1", values=[["№"]])
+    client = gspread.Client(None, session=session)
+    ws = client.open_by_key("sheet-id").worksheet("Лист1")
+
+У боті вмикається змінною оточення FAKE_SHEETS=1.
+"""
+
+import copy
+import json as _json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import unquote, urlparse
+
+_PATH_RE = re.compile(r"^/v4/spreadsheets/([^/:]+)(.*)$")
+_CELL_RE = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+
+class FakeSheetsError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FakeResponse:
+    """Мінімальний аналог requests.Response, якого достатньо gspread."""
+
+    def __init__(self, status_code: int, payload: dict = None, headers: dict = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self._payload = payload if payload is not None else {}
+        self.text = _json.dumps(self._payload, ensure_ascii=False)
+        self.content = self.text.encode("utf-8")
+
+    def json(self):
+        return self._payload
+
+
+############################################
+# A1-НОТАЦІЯ
+############################################
+
+def column_index(letters: str) -> int:
+    """'A' -> 1, 'AZ' -> 52."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index
+
+
+def column_letters(index: int) -> str:
+    letters = ""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def split_range(a1: str):
+    """"'Лист 1'!A2:B" -> ("Лист 1", "A2:B"); "Лист1" -> ("Лист1", ""); "A1:B2" -> (None, "A1:B2")."""
+    a1 = a1.strip()
+    if "!" in a1:
+        title, ref = a1.rsplit("!", 1)
+    elif all(_CELL_RE.match(part) for part in a1.split(":")) and a1:
+        return None, a1
+    else:
+        title, ref = a1, ""
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, ref
+
+
+def parse_ref(ref: str):
+    """
+    "A2:B10" -> (2, 1, 10, 2) — рядок/стовпець з 1, включно.
+    Відкриті межі ("A:A", "A2:A", порожній ref) повертаються як None.
+    """
+    if not ref:
+        return None, None, None, None
+    parts = ref.split(":")
+    start = _CELL_RE.match(parts[0])
+    end = _CELL_RE.match(parts[-1])
+    if not start or not end:
+        raise FakeSheetsError(400, f"Unable to parse range: {ref}")
+    r1 = int(start.group(2)) if start.group(2) else None
+    c1 = column_index(start.group(1)) if start.group(1) else None
+    r2 = int(end.group(2)) if end.group(2) else None
+    c2 = column_index(end.group(1)) if end.group(1) else None
+    if len(parts) == 1:
+        # Одна клітинка (або цілий рядок/стовпець)
+        return r1, c1, r1, c1
+    return r1, c1, r2, c2
+
+
+def render(value) -> str:
+    """Як Sheets показує значення (FORMATTED_VALUE)."""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+############################################
+# МОДЕЛЬ ТАБЛИЦІ
+############################################
+
+class FakeSheet:
+    def __init__(self, sheet_id: int, title: str, index: int, rows: int, cols: int):
+        self.properties = {
+            "sheetId": sheet_id,
+            "title": title,
+            "index": index,
+            "sheetType": "GRID",
+            "gridProperties": {"rowCount": rows, "columnCount": cols},
+        }
+        # Значення: список рядків (довжина — до останньої заповненої клітинки)
+        self.cells = []
+        # (рядок, стовпець) з 0 -> userEnteredFormat
+        self.formats = {}
+        # стовпець з 0 -> ширина в пікселях
+        self.column_widths = {}
+
+    @property
+    def title(self) -> str:
+        return self.properties["title"]
+
+    @property
+    def row_count(self) -> int:
+        return self.properties["gridProperties"]["rowCount"]
+
+    @property
+    def col_count(self) -> int:
+        return self.properties["gridProperties"]["columnCount"]
+
+    def resolve(self, ref: str):
+        """Межі діапазону з 0, end — не включно, обрізані розміром листа."""
+        r1, c1, r2, c2 = parse_ref(ref)
+        start_row = (r1 or 1) - 1
+        start_col = (c1 or 1) - 1
+        end_row = r2 if r2 is not None else self.row_count
+        end_col = c2 if c2 is not None else self.col_count
+        if start_row >= self.row_count or start_col >= self.col_count:
+            raise FakeSheetsError(400, f"Range ('{self.title}'!{ref}) exceeds grid limits. "
+                                       f"Max rows: {self.row_count}, max columns: {self.col_count}")
+        return start_row, start_col, min(end_row, self.row_count), min(end_col, self.col_count)
+
+    def get(self, ref: str, major: str = "ROWS") -> list:
+        start_row, start_col, end_row, end_col = self.resolve(ref)
+        grid = []
+        for r in range(start_row, min(end_row, len(self.cells))):
+            row = self.cells[r][start_col:end_col]
+            grid.append([render(v) if v is not None else "" for v in row])
+        if major == "COLUMNS":
+            width = max((len(row) for row in grid), default=0)
+            grid = [[row[c] if c < len(row) else "" for row in grid] for c in range(width)]
+        # Як і справжній API: без порожніх хвостів у рядках і без порожніх рядків у кінці
+        grid = [self._trim(row) for row in grid]
+        while grid and not grid[-1]:
+            grid.pop()
+        return grid
+
+    @staticmethod
+    def _trim(row: list) -> list:
+        end = len(row)
+        while end and row[end - 1] == "":
+            end -= 1
+        return row[:end]
+
+    def set(self, start_row: int, start_col: int, values: list, major: str = "ROWS"):
+        if major == "COLUMNS":
+            width = max((len(col) for col in values), default=0)
+            values = [[col[r] if r < len(col) else None for col in values] for r in range(width)]
+        height = len(values)
+        width = max((len(row) for row in values), default=0)
+        if start_row + height > self.row_count or start_col + width > self.col_count:
+            raise FakeSheetsError(400, f"Range exceeds grid limits of sheet '{self.title}'")
+        for dr, row in enumerate(values):
+            r = start_row + dr
+            while len(self.cells) <= r:
+                self.cells.append([])
+            target = self.cells[r]
+            for dc, value in enumerate(row):
+                if value is None:
+                    # null у запиті — клітинку не змінюємо
+                    continue
+                c = start_col + dc
+                while len(target) <= c:
+                    target.append(None)
+                target[c] = value if value != "" else None
+        return height, width
+
+    def clear(self, ref: str):
+        start_row, start_col, end_row, end_col = self.resolve(ref)
+        for r in range(start_row, min(end_row, len(self.cells))):
+            row = self.cells[r]
+            for c in range(start_col, min(end_col, len(row))):
+                row[c] = None
+
+    def last_data_row(self, start_col: int = 0, end_col: int = None) -> int:
+        """Кількість рядків до останнього непорожнього (у вказаних стовпцях)."""
+        for r in range(len(self.cells) - 1, -1, -1):
+            if any(v not in (None, "") for v in self.cells[r][start_col:end_col]):
+                return r + 1
+        return 0
+
+    def delete_rows(self, start: int, end: int):
+        del self.cells[start:end]
+        count = end - start
+        self.formats = {
+            (r - count if r >= end else r, c): fmt
+            for (r, c), fmt in self.formats.items()
+            if not start <= r < end
+        }
+        self.properties["gridProperties"]["rowCount"] -= count
+
+    def insert_rows(self, start: int, end: int):
+        count = end - start
+        if start < len(self.cells):
+            self.cells[start:start] = [[] for _ in range(count)]
+        self.formats = {
+            (r + count if r >= start else r, c): fmt for (r, c), fmt in self.formats.items()
+        }
+        self.properties["gridProperties"]["rowCount"] += count
+
+    def delete_columns(self, start: int, end: int):
+        for row in self.cells:
+            del row[start:end]
+        count = end - start
+        self.formats = {
+            (r, c - count if c >= end else c): fmt
+            for (r, c), fmt in self.formats.items()
+            if not start <= c < end
+        }
+        self.properties["gridProperties"]["columnCount"] -= count
+
+    def delete_range_shift_up(self, start_row: int, end_row: int, start_col: int, end_col: int):
+        """deleteRange зі shiftDimension=ROWS: клітинки нижче піднімаються в межах стовпців."""
+        count = end_row - start_row
+        for c in range(start_col, end_col):
+            column = [row[c] if c < len(row) else None for row in self.cells]
+            column = column[:start_row] + column[end_row:] + [None] * count
+            for r, value in enumerate(column[:len(self.cells)]):
+                row = self.cells[r]
+                if value is None and c >= len(row):
+                    continue
+                while len(row) <= c:
+                    row.append(None)
+                row[c] = value
+            for r in range(start_row, self.row_count):
+                if r + count < self.row_count and (r + count, c) in self.formats:
+                    self.formats[(r, c)] = self.formats[(r + count, c)]
+                else:
+                    self.formats.pop((r, c), None)
+
+
+class FakeSpreadsheet:
+    def __init__(self, spreadsheet_id: str, title: str):
+        self.id = spreadsheet_id
+        self.title = title
+        self.sheets = []
+
+    def sheet_by_title(self, title: str) -> FakeSheet:
+        for sheet in self.sheets:
+            if sheet.title == title:
+                return sheet
+        raise FakeSheetsError(400, f"Unable to parse range: '{title}'")
+
+    def sheet_by_id(self, sheet_id: int) -> FakeSheet:
+        for sheet in self.sheets:
+            if sheet.properties["sheetId"] == sheet_id:
+                return sheet
+        raise FakeSheetsError(400, f"No grid with id: {sheet_id}")
+
+    def sheet_for_range(self, a1: str):
+        title, ref = split_range(a1)
+        sheet = self.sheet_by_title(title) if title is not None else self.sheets[0]
+        return sheet, ref
+
+    def metadata(self) -> dict:
+        return {
+            "spreadsheetId": self.id,
+            "properties": {"title": self.title},
+            "sheets": [{"properties": _json.loads(_json.dumps(s.properties))} for s in self.sheets],
+        }
+
+
+############################################
+# СЕСІЯ (ЗАМІНА AuthorizedSession)
+############################################
+
+class FakeSheetsSession:
+    """
+    Сумісна з requests.Session обгортка над FakeSpreadsheet-ами.
+    Потокобезпечна: бот звертається до неї з кількох потоків SHEETS_POOL.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.spreadsheets = {}
+        self.calls = Counter()
+        self.headers = {}
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._forced_errors = []
+        self._next_sheet_id = 1000
+
+    # --- налаштування ---
+
+    def add_spreadsheet(self, spreadsheet_id: str, title: str = None) -> FakeSpreadsheet:
+        with self._lock:
+            if spreadsheet_id not in self.spreadsheets:
+                self.spreadsheets[spreadsheet_id] = FakeSpreadsheet(spreadsheet_id, title or spreadsheet_id)
+            return self.spreadsheets[spreadsheet_id]
+
+    def add_sheet(self, spreadsheet_id: str, title: str, rows: int = 1000, cols: int = 26,
+                  values: list = None) -> FakeSheet:
+        """Додає лист (і таблицю, якщо її ще немає); values — початкові рядки з A1."""
+        with self._lock:
+            spreadsheet = self.add_spreadsheet(spreadsheet_id)
+            for sheet in spreadsheet.sheets:
+                if sheet.title == title:
+                    return sheet
+            sheet = self._new_sheet(spreadsheet, title, rows, cols)
+            if values:
+                sheet.set(0, 0, values)
+            return sheet
+
+    def fail_next(self, count: int = 1, status: int = 429):
+        """Наступні count викликів завершаться помилкою status."""
+        with self._lock:
+            self._forced_errors.extend([status] * count)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    # --- інтерфейс requests.Session ---
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+    def get(self, url, **kwargs):
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("put", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("delete", url, **kwargs)
+
+    def request(self, method, url, params=None, json=None, data=None, files=None, headers=None, **kwargs):
+        method = method.lower()
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            try:
+                name, handler = self._route(method, urlparse(url).path)
+                self.calls[name] += 1
+                if self._forced_errors:
+                    raise FakeSheetsError(self._forced_errors.pop(0), "Injected error")
+                if self.error_rate and self._random.random() < self.error_rate:
+                    raise FakeSheetsError(429, "Quota exceeded for quota metric 'Requests' (injected)")
+                payload = handler(params or {}, json if json is not None else (_json.loads(data) if data else {}))
+                return FakeResponse(200, payload)
+            except FakeSheetsError as e:
+                status_names = {400: "INVALID_ARGUMENT", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED"}
+                return FakeResponse(e.status, {"error": {
+                    "code": e.status,
+                    "message": e.message,
+                    "status": status_names.get(e.status, "INTERNAL"),
+                }})
+
+    # --- маршрутизація ---
+
+    def _route(self, method: str, path: str):
+        match = _PATH_RE.match(path)
+        if not match:
+            raise FakeSheetsError(404, f"Unsupported URL: {path}")
+        spreadsheet = self.spreadsheets.get(unquote(match.group(1)))
+        if spreadsheet is None:
+            raise FakeSheetsError(404, "Requested entity was not found.")
+        rest = match.group(2)
+
+        if rest == "" and method == "get":
+            return "spreadsheets.get", lambda params, body: spreadsheet.metadata()
+        if rest == ":batchUpdate" and method == "post":
+            return "spreadsheets.batchUpdate", lambda params, body: self._batch_update(spreadsheet, body)
+        if rest == "/values:batchGet" and method == "get":
+            return "values.batchGet", lambda params, body: self._values_batch_get(spreadsheet, params)
+        if rest == "/values:batchUpdate" and method == "post":
+            return "values.batchUpdate", lambda params, body: self._values_batch_update(spreadsheet, body)
+        if rest.startswith("/values/"):
+            raw = rest[len("/values/"):]
+            for suffix, name, verb, handler in (
+                (":append", "values.append", "post", self._values_append),
+                (":clear", "values.clear", "post", self._values_clear),
+            ):
+                if raw.endswith(suffix) and method == verb:
+                    a1 = unquote(raw[:-len(suffix)])
+                    return name, lambda params, body: handler(spreadsheet, a1, params, body)
+            a1 = unquote(raw)
+            if method == "get":
+                return "values.get", lambda params, body: self._values_get(spreadsheet, a1, params)
+            if method == "put":
+                return "values.update", lambda params, body: self._values_update(spreadsheet, a1, params, body)
+        raise FakeSheetsError(404, f"Unsupported request: {method.upper()} {path}")
+
+    # --- values.* ---
+
+    @staticmethod
+    def _a1(sheet: FakeSheet, start_row: int, start_col: int, rows: int, cols: int) -> str:
+        first = f"{column_letters(start_col + 1)}{start_row + 1}"
+        last = f"{column_letters(start_col + max(cols, 1))}{start_row + max(rows, 1)}"
+        return f"'{sheet.title}'!{first}:{last}"
+
+    def _value_range(self, spreadsheet, a1: str, major: str) -> dict:
+        sheet, ref = spreadsheet.sheet_for_range(a1)
+        result = {"range": f"'{sheet.title}'!{ref}" if ref else f"'{sheet.title}'", "majorDimension": major}
+        values = sheet.get(ref, major)
+        if values:
+            result["values"] = values
+        return result
+
+    def _values_get(self, spreadsheet, a1: str, params: dict) -> dict:
+        return self._value_range(spreadsheet, a1, params.get("majorDimension", "ROWS"))
+
+    def _values_batch_get(self, spreadsheet, params: dict) -> dict:
+        ranges = params.get("ranges", [])
+        if isinstance(ranges, str):
+            ranges = [ranges]
+        major = params.get("majorDimension", "ROWS")
+        return {
+            "spreadsheetId": spreadsheet.id,
+            "valueRanges": [self._value_range(spreadsheet, a1, major) for a1 in ranges],
+        }
+
+    def _write(self, spreadsheet, a1: str, values: list, major: str) -> dict:
+        sheet, ref = spreadsheet.sheet_for_range(a1)
+        start_row, start_col, _, _ = sheet.resolve(ref)
+        rows, cols = sheet.set(start_row, start_col, values, major)
+        return {
+            "spreadsheetId": spreadsheet.id,
+            "updatedRange": self._a1(sheet, start_row, start_col, rows, cols),
+            "updatedRows": rows,
+            "updatedColumns": cols,
+            "updatedCells": sum(len(row) for row in values),
+        }
+
+    def _values_update(self, spreadsheet, a1: str, params: dict, body: dict) -> dict:
+        return self._write(spreadsheet, a1, body.get("values", []), body.get("majorDimension", "ROWS"))
+
+    def _values_batch_update(self, spreadsheet, body: dict) -> dict:
+        responses = [
+            self._write(spreadsheet, item["range"], item.get("values", []), item.get("majorDimension", "ROWS"))
+            for item in body.get("data", [])
+        ]
+        return {
+            "spreadsheetId": spreadsheet.id,
+            "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+            "responses": responses,
+        }
+
+    def _values_append(self, spreadsheet, a1: str, params: dict, body: dict) -> dict:
+        sheet, ref = spreadsheet.sheet_for_range(a1)
+        _, start_col, _, end_col = sheet.resolve(ref)
+        values = body.get("values", [])
+        start_row = sheet.last_data_row(start_col, end_col)
+        # Як і справжній append — лист розширюється, якщо рядків не вистачає
+        missing = start_row + len(values) - sheet.row_count
+        if missing > 0:
+            sheet.properties["gridProperties"]["rowCount"] += missing
+        rows, cols = sheet.set(start_row, start_col, values, body.get("majorDimension", "ROWS"))
+        return {
+            "spreadsheetId": spreadsheet.id,
+            "tableRange": self._a1(sheet, 0, start_col, start_row, cols) if start_row else None,
+            "updates": {
+                "spreadsheetId": spreadsheet.id,
+                "updatedRange": self._a1(sheet, start_row, start_col, rows, cols),
+                "updatedRows": rows,
+                "updatedColumns": cols,
+                "updatedCells": sum(len(row) for row in values),
+            },
+        }
+
+    def _values_clear(self, spreadsheet, a1: str, params: dict, body: dict) -> dict:
+        sheet, ref = spreadsheet.sheet_for_range(a1)
+        sheet.clear(ref)
+        return {"spreadsheetId": spreadsheet.id, "clearedRange": f"'{sheet.title}'!{ref}"}
+
+    # --- spreadsheets.batchUpdate ---
+
+    def _new_sheet(self, spreadsheet, title: str, rows: int, cols: int, sheet_id: int = None) -> FakeSheet:
+        if sheet_id is None:
+            self._next_sheet_id += 1
+            sheet_id = self._next_sheet_id
+        sheet = FakeSheet(sheet_id, title, len(spreadsheet.sheets), rows, cols)
+        spreadsheet.sheets.append(sheet)
+        return sheet
+
+    @staticmethod
+    def _grid(sheet: FakeSheet, grid_range: dict):
+        return (
+            grid_range.get("startRowIndex", 0),
+            grid_range.get("endRowIndex", sheet.row_count),
+            grid_range.get("startColumnIndex", 0),
+            grid_range.get("endColumnIndex", sheet.col_count),
+        )
+
+    def _batch_update(self, spreadsheet, body: dict) -> dict:
+        """
+        Як і в справжньому API, запити застосовуються атомарно: якщо хоч один
+        не вдався, таблиця повертається до стану перед викликом.
+        """
+        saved_sheets = list(spreadsheet.sheets)
+        saved_state = copy.deepcopy([sheet.__dict__ for sheet in saved_sheets])
+        saved_next_id = self._next_sheet_id
+        try:
+            replies = []
+            for request in body.get("requests", []):
+                (kind, args), = request.items()
+                handler = getattr(self, f"_request_{kind}", None)
+                if handler is None:
+                    raise FakeSheetsError(400, f"Unsupported request type: {kind}")
+                replies.append(handler(spreadsheet, args) or {})
+        except Exception:
+            for sheet, state in zip(saved_sheets, saved_state):
+                sheet.__dict__.clear()
+                sheet.__dict__.update(state)
+            spreadsheet.sheets[:] = saved_sheets
+            self._next_sheet_id = saved_next_id
+            raise
+        return {"spreadsheetId": spreadsheet.id, "replies": replies}
+
+    def _request_repeatCell(self, spreadsheet, args):
+        sheet = spreadsheet.sheet_by_id(args["range"].get("sheetId", 0))
+        r1, r2, c1, c2 = self._grid(sheet, args["range"])
+        fmt = args.get("cell", {}).get("userEnteredFormat", {})
+        for r in range(r1, min(r2, sheet.row_count)):
+            for c in range(c1, min(c2, sheet.col_count)):
+                merged = dict(sheet.formats.get((r, c), {}))
+                merged.update(fmt)
+                sheet.formats[(r, c)] = merged
+
+    def _request_deleteDimension(self, spreadsheet, args):
+        grid = args["range"]
+        sheet = spreadsheet.sheet_by_id(grid.get("sheetId", 0))
+        if grid["dimension"] == "ROWS":
+            sheet.delete_rows(grid["startIndex"], grid["endIndex"])
+        else:
+            sheet.delete_columns(grid["startIndex"], grid["endIndex"])
+
+    def _request_insertDimension(self, spreadsheet, args):
+        grid = args["range"]
+        sheet = spreadsheet.sheet_by_id(grid.get("sheetId", 0))
+        if grid["dimension"] != "ROWS":
+            raise FakeSheetsError(400, "Only ROWS insertDimension is supported")
+        sheet.insert_rows(grid["startIndex"], grid["endIndex"])
+
+    def _request_appendDimension(self, spreadsheet, args):
+        sheet = spreadsheet.sheet_by_id(args.get("sheetId", 0))
+        if args["dimension"] != "ROWS":
+            raise FakeSheetsError(400, "Only ROWS appendDimension is supported")
+        sheet.properties["gridProperties"]["rowCount"] += int(args["length"])
+
+    def _request_deleteRange(self, spreadsheet, args):
+        sheet = spreadsheet.sheet_by_id(args["range"].get("sheetId", 0))
+        if args.get("shiftDimension") != "ROWS":
+            raise FakeSheetsError(400, "Only shiftDimension=ROWS is supported")
+        r1, r2, c1, c2 = self._grid(sheet, args["range"])
+        sheet.delete_range_shift_up(r1, r2, c1, c2)
+
+    def _request_addSheet(self, spreadsheet, args):
+        props = args.get("properties", {})
+        title = props.get("title") or f"Sheet{len(spreadsheet.sheets) + 1}"
+        if any(s.title == title for s in spreadsheet.sheets):
+            raise FakeSheetsError(400, f'A sheet with the name "{title}" already exists.')
+        grid = props.get("gridProperties", {})
+        sheet = self._new_sheet(spreadsheet, title, int(grid.get("rowCount", 1000)),
+                                int(grid.get("columnCount", 26)), props.get("sheetId"))
+        return {"addSheet": {"properties": _json.loads(_json.dumps(sheet.properties))}}
+
+    def _request_deleteSheet(self, spreadsheet, args):
+        sheet = spreadsheet.sheet_by_id(args["sheetId"])
+        spreadsheet.sheets.remove(sheet)
+
+    def _request_updateSheetProperties(self, spreadsheet, args):
+        props = args["properties"]
+        sheet = spreadsheet.sheet_by_id(props.get("sheetId", 0))
+        for key, value in props.items():
+            if key == "gridProperties":
+                sheet.properties["gridProperties"].update({k: int(v) for k, v in value.items()})
+            elif key != "sheetId":
+                sheet.properties[key] = value
+
+    def _request_updateDimensionProperties(self, spreadsheet, args):
+        grid = args["range"]
+        sheet = spreadsheet.sheet_by_id(grid.get("sheetId", 0))
+        size = args.get("properties", {}).get("pixelSize")
+        if grid["dimension"] == "COLUMNS" and size is not None:
+            for c in range(grid.get("startIndex", 0), grid.get("endIndex", sheet.col_count)):
+                sheet.column_widths[c] = size
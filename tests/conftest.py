@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+Оточення для тестів: bot.py читає налаштування під час імпорту, тому змінні
+задаються до першого `import bot`. Google Sheets — імітація з fake_sheets.py.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.update({
+    "TELEGRAM_TOKEN": "123456:test",
+    "GSPREAD_CREDENTIALS_JSON": "{}",
+    "DATA_DIR": tempfile.mkdtemp(prefix="agro-bot-tests-"),
+    "FAKE_SHEETS": "1",
+    "GOOGLE_SPREADSHEET_ID": "test-sheet-1",
+    "GOOGLE_SPREADSHEET_ID2": "test-sheet-2",
+    "APPS_JOURNAL_FSYNC": "0",
+    "STORAGE_BACKEND": "json",
+})
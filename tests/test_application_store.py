@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+import bot
+
+
+def make_store(tmp_path, apps=None):
+    path = tmp_path / "applications_by_user.json"
+    if not path.exists():
+        path.write_text(json.dumps(apps or {}), encoding="utf-8")
+    return bot.ApplicationStore(str(path), str(tmp_path / "applications_by_user.journal"),
+                                compact_interval=3600, compact_records=10_000, fsync=False)
+
+
+def run_in_loop(func):
+    """Поза event loop сховище стискається після кожного запису — тут журнал має накопичуватися."""
+    async def wrapper():
+        return func()
+    return asyncio.run(wrapper())
+
+
+def summary(store) -> dict:
+    return {
+        uid: [(app.get("culture"), app.get("sheet_row"), app.get("proposal_status")) for app in user_apps]
+        for uid, user_apps in store.apps.items()
+    }
+
+
+def test_journal_replay_after_crash_drops_torn_record(tmp_path):
+    store = make_store(tmp_path)
+
+    def scenario():
+        store.add("1", {"culture": "пшениця", "sheet_row": 2, "proposal_status": "active"})
+        store.add("1", {"culture": "ячмінь", "sheet_row": 3, "proposal_status": "active"})
+        store.add("2", {"culture": "соняшник", "sheet_row": 4, "proposal_status": "active"})
+        store.update("1", 0, {"proposal_status": "Agreed"})
+        store.remove("1", 1)
+        store._journal.flush()
+
+    run_in_loop(scenario)
+    expected = summary(store)
+    journal_path = store.journal_path
+    good_size = os.path.getsize(journal_path)
+    # Процес упав посеред запису: останній рядок журналу обірваний
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "uid": "3", "app": {"cult')
+
+    reloaded = make_store(tmp_path)
+    run_in_loop(lambda: reloaded.apps)
+
+    assert summary(reloaded) == expected
+    assert os.path.getsize(journal_path) == good_size
+    assert reloaded.find_by_sheet_row(4)[0][:2] == ("2", 0)
+    assert reloaded.get("1", 0)["version"] == 2
+
+
+def test_compaction_keeps_records_written_afterwards(tmp_path):
+    store = make_store(tmp_path)
+
+    def scenario():
+        for row in range(2, 12):
+            store.add(str(row), {"culture": "кукурудза", "sheet_row": row, "proposal_status": "active"})
+        store.compact()
+        store.update("5", 0, {"proposal_status": "waiting"})
+        store.add("5", {"culture": "ріпак", "sheet_row": 12, "proposal_status": "active"})
+        store._journal.flush()
+
+    run_in_loop(scenario)
+    reloaded = make_store(tmp_path)
+    assert summary(reloaded) == summary(store)
+    assert len(reloaded.list_by_status("waiting")) == 1
+
+
+def test_row_index_keeps_every_application_on_a_row(tmp_path):
+    store = make_store(tmp_path, {
+        "1": [{"culture": "пшениця", "sheet_row": 5}],
+        "2": [{"culture": "ячмінь", "sheet_row": 5}],
+    })
+
+    assert [ref[:2] for ref in store.find_by_sheet_row(5)] == [("1", 0), ("2", 0)]
+    run_in_loop(lambda: store.update("1", 0, {"sheet_row": 6}))
+    assert [ref[:2] for ref in store.find_by_sheet_row(5)] == [("2", 0)]
+    assert [ref[:2] for ref in store.find_by_sheet_row(6)] == [("1", 0)]
+
+
+def test_deleted_sheet_rows_shift_only_legacy_applications(tmp_path):
+    store = make_store(tmp_path, {
+        "1": [{"sheet_row": 2}, {"sheet_row": 4}, {"sheet_row": 6}],
+        "2": [{"sheet_row": 8, "request_number": "17"}],
+    })
+
+    run_in_loop(lambda: store.shift_sheet_rows([3, 4]))
+
+    assert [app["sheet_row"] for app in store.get_user_apps("1")] == [2, None, 4]
+    # Заявки з номером знаходять свій рядок за номером, їхній sheet_row не змінюється
+    assert store.get("2", 0)["sheet_row"] == 8
+    assert [ref[:2] for ref in store.list_legacy()] == [("1", 0), ("1", 2)]
+    assert summary(make_store(tmp_path)) == summary(store)
+
+
+def test_journal_fsync_runs_in_disk_pool(tmp_path, monkeypatch):
+    store = bot.ApplicationStore(str(tmp_path / "apps.json"), str(tmp_path / "apps.journal"),
+                                 compact_interval=3600, compact_records=10_000, fsync=True)
+    (tmp_path / "apps.json").write_text("{}", encoding="utf-8")
+    fsync_threads = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsync_threads.append(threading.current_thread()), real_fsync(fd)))
+
+    async def scenario():
+        for row in range(2, 7):
+            store.add("1", {"sheet_row": row})
+        loop_thread = threading.current_thread()
+        await store.sync_journal()
+        return loop_thread
+
+    loop_thread = asyncio.run(scenario())
+    assert fsync_threads and loop_thread not in fsync_threads
+    assert store._synced_seq == store._seq == 5
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10-12", ["10", "11", "12"]),
+    ("3, 7 12", ["3", "7", "12"]),
+    ("7, 3, 7", ["7", "3"]),
+    ("abc", []),
+])
+def test_parse_request_numbers(text, expected):
+    assert bot.parse_request_numbers(text) == expected
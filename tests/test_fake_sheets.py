@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import gspread
+import pytest
+from gspread.exceptions import APIError
+
+from fake_sheets import FakeSheetsSession
+
+
+def test_failed_batch_update_leaves_spreadsheet_unchanged():
+    session = FakeSheetsSession()
+    session.add_sheet("atomic", "Лист1", rows=5, values=[["№"], ["1"], ["2"], ["3"]])
+    spreadsheet = gspread.Client(None, session=session).open_by_key("atomic")
+    ws = spreadsheet.worksheet("Лист1")
+
+    with pytest.raises(APIError):
+        spreadsheet.batch_update({"requests": [
+            {"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": 1, "endIndex": 2}}},
+            {"addSheet": {"properties": {"title": "Новий"}}},
+            {"addSheet": {"properties": {"title": "Лист1"}}},
+        ]})
+
+    assert ws.col_values(1) == ["№", "1", "2", "3"]
+    assert [sheet.title for sheet in spreadsheet.worksheets()] == ["Лист1"]
+    assert spreadsheet.fetch_sheet_metadata()["sheets"][0]["properties"]["gridProperties"]["rowCount"] == 5
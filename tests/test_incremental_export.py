@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import bot
+
+
+def user_row(uid: str) -> list:
+    return [uid, f"Користувач {uid}", f"+380{uid}", "", 1]
+
+
+def sheet_ids(export) -> list:
+    ws = bot.get_cached_worksheet(export.spreadsheet_id, export.sheet_name)
+    return ws.col_values(1)
+
+
+def grid_rows(export) -> int:
+    ws = bot.get_cached_worksheet(export.spreadsheet_id, export.sheet_name)
+    return bot.refresh_grid_size(ws).row_count
+
+
+def test_apply_creates_sheet_and_appends_new_users():
+    export = bot.IncrementalExport(bot.GOOGLE_SPREADSHEET_ID, "Експорт-створення")
+
+    assert export._apply({uid: user_row(uid) for uid in ("11", "12", "13")}, True) == 4
+    assert sheet_ids(export) == ["ID", "11", "12", "13"]
+    assert export.rows == {"11": 2, "12": 3, "13": 4}
+    assert grid_rows(export) == 4
+
+
+def test_apply_shifts_rows_below_removed_users():
+    export = bot.IncrementalExport(bot.GOOGLE_SPREADSHEET_ID, "Експорт-зсув")
+    export._apply({uid: user_row(uid) for uid in ("1", "2", "3", "4", "5")}, True)
+
+    # Видаляються 2 і 4, додається 6, змінюється 5
+    updated = user_row("5")
+    updated[1] = "Користувач 5 (оновлено)"
+    export._apply({"2": None, "4": None, "6": user_row("6"), "5": updated}, False)
+
+    assert export.rows == {"1": 2, "3": 3, "5": 4, "6": 5}
+    assert sheet_ids(export) == ["ID", "1", "3", "5", "6"]
+    ws = bot.get_cached_worksheet(export.spreadsheet_id, export.sheet_name)
+    assert ws.row_values(4)[1] == "Користувач 5 (оновлено)"
+    assert grid_rows(export) == 5
+
+
+def test_full_apply_after_restart_rereads_rows_and_drops_unknown_users():
+    sheet_name = "Експорт-перезапуск"
+    first = bot.IncrementalExport(bot.GOOGLE_SPREADSHEET_ID, sheet_name)
+    first._apply({uid: user_row(uid) for uid in ("7", "8", "9")}, True)
+
+    # Новий процес: карта рядків читається зі стовпця A, 8 більше не схвалений
+    restarted = bot.IncrementalExport(bot.GOOGLE_SPREADSHEET_ID, sheet_name)
+    restarted._apply({"7": user_row("7"), "9": user_row("9")}, True)
+
+    assert restarted.rows == {"7": 2, "9": 3}
+    assert sheet_ids(restarted) == ["ID", "7", "9"]
+    assert grid_rows(restarted) == 3